@@ -0,0 +1,188 @@
+"""
+Headless batch mode: draft replies for every open ticket in the queue using a pool of browser sessions.
+
+Browser sessions only scrape; cleaning, summarization and retrieval run on a CPU executor and the
+LLM calls on a separate executor, so scraping, summarizing and generating overlap across tickets.
+Drafts are written as JSON lines and throughput is reported in tickets per minute.
+
+Usage:
+    python batch_worker.py --sessions 2 --output drafts.jsonl
+    HELPDESK_URL=file://$PWD/fixtures/requests.html python batch_worker.py --no-login --scrape-only
+"""
+import os
+import json
+import time
+import queue
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import main as helpdesk
+from colors import GREEN, RESET, YELLOW
+from tracing import TicketTrace
+
+class SessionPool:
+    """
+    Fixed-size pool of logged-in browser sessions, handed out one ticket at a time.
+    """
+
+    def __init__(self, size, headless=True, login=True):
+        """
+        Args:
+            size (int): Number of browser sessions to start.
+            headless (bool): Run Chrome without a visible window.
+            login (bool): Log each session in; disable for local fixtures that have no login page.
+        """
+        self._sessions = queue.Queue()
+        self._drivers = []
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            for driver in executor.map(lambda _: self._start_session(headless, login), range(size)):
+                self._drivers.append(driver)
+                self._sessions.put(driver)
+
+    @staticmethod
+    def _start_session(headless, login):
+        driver = helpdesk.create_driver(headless=headless)
+        if login:
+            helpdesk.login(driver)
+        else:
+            driver.get(helpdesk.requests_url())
+        return driver
+
+    def __len__(self):
+        return len(self._drivers)
+
+    @contextlib.contextmanager
+    def session(self):
+        """
+        Context manager that borrows a session and returns it to the pool afterwards.
+        """
+        driver = self._sessions.get()
+        try:
+            yield driver
+        finally:
+            self._sessions.put(driver)
+
+    def close(self):
+        for driver in self._drivers:
+            driver.quit()
+
+def run_batch(sessions=2, cpu_workers=None, llm_workers=1, output=None, login=True, scrape_only=False, limit=None):
+    """
+    Draft replies for every open ticket in the request list.
+
+    Args:
+        sessions (int): Number of browser sessions scraping tickets in parallel.
+        cpu_workers (int): Threads for cleaning, summarization and retrieval. Defaults to half the CPU count.
+        llm_workers (int): Concurrent LLM requests.
+        output (str): Path of a JSON lines file receiving one draft per ticket.
+        login (bool): Log the sessions in; disable for local fixtures.
+        scrape_only (bool): Stop after scraping, skipping the model stages.
+        limit (int): Draft at most this many tickets.
+
+    Returns:
+        list[dict]: The drafts, in completion order.
+    """
+    helpdesk.load_dotenv()
+    # The models and the index load while the browser sessions start and the request list is read
+    pipeline_ready = None if scrape_only else helpdesk.start_pipeline()
+    cpu_workers = cpu_workers or max(1, (os.cpu_count() or 2) // 2)
+    cpu_stages = [(name, stage) for name, stage, uses_llm in helpdesk.DRAFT_STAGES if not uses_llm]
+    llm_stages = [(name, stage) for name, stage, uses_llm in helpdesk.DRAFT_STAGES if uses_llm]
+
+    pool = SessionPool(sessions, login=login)
+    browser_executor = ThreadPoolExecutor(max_workers=len(pool), thread_name_prefix="browser")
+    cpu_executor = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="cpu")
+    llm_executor = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="llm")
+    finished = queue.Queue()
+    drafts = []
+    traces = {}
+
+    def run_stages(stages, draft):
+        trace = traces[draft["number"]]
+        for name, stage in stages:
+            with trace.span(name):
+                draft.update(stage(draft))
+        return draft
+
+    def scrape(ticket):
+        with pool.session() as driver:
+            with traces[ticket["number"]].span("scrape"):
+                return dict(ticket, **helpdesk.fetch_from_list(driver, ticket["number"]))
+
+    def then(executor, stages, ticket):
+        """
+        Build a done-callback that hands a finished step's draft to the next executor, so no
+        worker ever blocks waiting on another executor.
+        """
+        def _callback(future):
+            try:
+                draft = future.result()
+            except Exception as e:
+                finished.put((ticket, None, e))
+                return
+            if executor is None:
+                finished.put((ticket, draft, None))
+                return
+            next_executor, next_stages = (llm_executor, llm_stages) if executor is cpu_executor else (None, None)
+            executor.submit(run_stages, stages, draft).add_done_callback(then(next_executor, next_stages, ticket))
+        return _callback
+
+    start = time.perf_counter()
+    try:
+        with pool.session() as driver:
+            tickets = [ticket for ticket in helpdesk.scrape_tickets(driver) if helpdesk.is_open_ticket(ticket)]
+        tickets = tickets[:limit] if limit else tickets
+        if pipeline_ready is not None:
+            pipeline_ready.result()
+        print(f"Drafting {len(tickets)} open tickets with {len(pool)} sessions, {cpu_workers} CPU workers and {llm_workers} LLM workers.")
+
+        # Created before any work is submitted, so each trace's total includes time queued behind other tickets
+        traces.update((ticket["number"], TicketTrace(ticket["number"], mode="batch")) for ticket in tickets)
+        for ticket in tickets:
+            first_executor, first_stages = (None, None) if scrape_only else (cpu_executor, cpu_stages)
+            browser_executor.submit(scrape, ticket).add_done_callback(then(first_executor, first_stages, ticket))
+
+        with open(output, "a", encoding="utf-8") if output else contextlib.nullcontext() as out:
+            for _ in tickets:
+                ticket, draft, error = finished.get()
+                traces[ticket["number"]].finish()
+                if error is not None:
+                    print(f"{YELLOW}Could not draft ticket {ticket['number']}: {error}{RESET}")
+                    continue
+                drafts.append(draft)
+                print(f"Drafted ticket {draft['number']}: {draft['subject']}")
+                if out:
+                    out.write(json.dumps({key: draft.get(key) for key in (
+                        "number", "subject", "summarized_thread", "similar_resolution", "ai_reply", "email_thread",
+                    )}, ensure_ascii=False) + "\n")
+                    out.flush()
+    finally:
+        browser_executor.shutdown(wait=False, cancel_futures=True)
+        cpu_executor.shutdown(wait=False, cancel_futures=True)
+        llm_executor.shutdown(wait=False, cancel_futures=True)
+        pool.close()
+
+    elapsed = time.perf_counter() - start
+    rate = len(drafts) / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"{GREEN}Drafted {len(drafts)} tickets in {elapsed:.1f}s ({rate:.1f} tickets/min).{RESET}")
+    return drafts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Draft replies for all open tickets with a pool of headless browser sessions.")
+    parser.add_argument("--sessions", type=int, default=2, help="Number of browser sessions.")
+    parser.add_argument("--cpu-workers", type=int, default=None, help="Threads for cleaning, summarization and retrieval.")
+    parser.add_argument("--llm-workers", type=int, default=int(os.getenv("OLLAMA_PARALLEL", "1")), help="Concurrent LLM requests.")
+    parser.add_argument("--output", default="drafts.jsonl", help="JSON lines file receiving the drafts.")
+    parser.add_argument("--limit", type=int, default=None, help="Draft at most this many tickets.")
+    parser.add_argument("--no-login", action="store_true", help="Skip the login flow (local HTML fixtures).")
+    parser.add_argument("--scrape-only", action="store_true", help="Only scrape the tickets, skipping the model stages.")
+    args = parser.parse_args()
+    run_batch(
+        sessions=args.sessions,
+        cpu_workers=args.cpu_workers,
+        llm_workers=args.llm_workers,
+        output=args.output,
+        login=not args.no_login,
+        scrape_only=args.scrape_only,
+        limit=args.limit,
+    )
@@ -0,0 +1,95 @@
+"""
+Throughput benchmark for clean_text_for_ai on large synthetic email threads.
+
+Compares the compiled TextCleaner with the original replace-per-phrase cleaner and reports MB/s for
+each thread size. The outputs are not expected to match exactly (see TextCleaner), so the number of
+output lines that differ is reported alongside.
+
+Usage:
+    python benchmarks/bench_clean_text.py [--sizes 10 100 500] [--repeat 5]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_cleaner import TextCleaner, load_boilerplate
+
+def legacy_clean_text_for_ai(text, redundant_texts):
+    """
+    The cleaner as it was before TextCleaner: one str.replace per phrase plus four regex passes.
+    """
+    for redundant_text in redundant_texts:
+        text = text.replace(redundant_text, "")
+    text = re.sub(r"\n+", "\n", text)
+    text = re.sub(r"\s{2,}", " ", text)
+    seen_lines = set()
+    cleaned_lines = []
+    for line in text.splitlines():
+        line_lower = line.strip().lower()
+        if line_lower and line_lower not in seen_lines:
+            seen_lines.add(line_lower)
+            cleaned_lines.append(line.strip())
+    cleaned_text = "\n".join(cleaned_lines)
+    cleaned_text = re.sub(r"(Hello,)+", "Regards,", cleaned_text)
+    cleaned_text = re.sub(r"(Thank you,)+", "Thank you,", cleaned_text)
+    return cleaned_text.strip()
+
+def synthetic_thread(size_kb, phrases, seed=0):
+    """
+    Build an email thread of roughly `size_kb` KB made of replies that quote the whole chain so far.
+    """
+    rng = random.Random(seed)
+    words = ["printer", "vpn", "password", "reset", "laptop", "monitor", "account", "access", "please", "issue",
+             "working", "update", "install", "license", "network", "drive", "shared", "folder", "error", "today"]
+    chain = []
+    thread = []
+    size = 0
+    while size < size_kb * 1024:
+        body = " ".join(rng.choice(words) for _ in range(rng.randint(15, 60)))
+        message = "\n".join([
+            "Hello,Hello,",
+            body.capitalize() + ".",
+            "",
+            rng.choice(phrases),
+            "Thank you,Thank you,",
+            "  " + rng.choice(phrases) + "   " + rng.choice(phrases),
+            "\n\n",
+        ])
+        chain.insert(0, message)
+        reply = "\n> ".join(chain[:8])
+        thread.append(reply)
+        size += len(reply)
+    return "\n".join(thread)
+
+def bench(function, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500], help="Thread sizes in KB.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size; the fastest is reported.")
+    args = parser.parse_args()
+
+    phrases = load_boilerplate()
+    cleaner = TextCleaner(phrases)
+    print(f"{'size':>8} {'legacy MB/s':>12} {'compiled MB/s':>14} {'speedup':>8} {'lines differing':>16}")
+    for size_kb in args.sizes:
+        text = synthetic_thread(size_kb, phrases)
+        megabytes = len(text.encode("utf-8")) / 1e6
+        legacy_time, legacy_result = bench(lambda t: legacy_clean_text_for_ai(t, phrases), text, args.repeat)
+        compiled_time, compiled_result = bench(cleaner.clean, text, args.repeat)
+        differing = len(set(legacy_result.splitlines()) ^ set(compiled_result.splitlines()))
+        print(f"{size_kb:>6}KB {megabytes / legacy_time:>12.1f} {megabytes / compiled_time:>14.1f} "
+              f"{legacy_time / compiled_time:>7.2f}x {differing:>16}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Offline latency and throughput benchmark for the non-browser stages of the reply pipeline.
+
+Replays recorded email threads through cleaning, summarization, retrieval, the LLM and response
+scoring against synthetic resolved tickets CSVs of increasing size, and reports p50/p95 latency
+per stage and end-to-end throughput. Recorded threads are JSON lines with 'subject' and
+'email_thread' fields, e.g. the drafts written by batch_worker.py; without them, synthetic threads
+are used. The CSVs and their indexes are generated once per size with a fixed seed and reused.
+
+Summarization and the LLM are opt-in because they need the BART weights and a running Ollama server.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--rows 10000 100000 1000000] [--threads drafts.jsonl]
+                                        [--summarize] [--llm] [--output bench_pipeline.jsonl]
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_clean_text import synthetic_thread
+from text_cleaner import clean_text_for_ai, load_boilerplate
+from tfidf_similarity import TicketIndex, compare_ai_response_to_resolution
+from tracing import TicketTrace, peak_rss_mb
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+IT_WORDS = ["printer", "vpn", "password", "reset", "laptop", "monitor", "account", "access", "email", "outlook",
+            "teams", "wifi", "network", "drive", "shared", "folder", "license", "install", "update", "error",
+            "login", "mfa", "phone", "docking", "station", "keyboard", "mouse", "software", "matlab", "zoom"]
+
+def synthetic_vocabulary(size, rng):
+    """
+    Build a vocabulary of IT terms plus made-up words, so the TF-IDF vocabulary grows like real ticket text.
+    """
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "qu", "dr", "st", "en", "or"]
+    words = set(IT_WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables, size=rng.integers(2, 5))))
+    return np.array(sorted(words))
+
+def write_synthetic_csv(path, n_rows, seed=0, chunk_rows=50000):
+    """
+    Write a resolved tickets CSV with Zipf-distributed words in the subjects and resolutions.
+
+    Args:
+        path (str): Output CSV path.
+        n_rows (int): Number of tickets.
+        seed (int): Random seed; the same seed always produces the same file.
+        chunk_rows (int): Rows generated per batch.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = synthetic_vocabulary(20000, rng)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Subject", "Resolution"])
+        for start in range(0, n_rows, chunk_rows):
+            count = min(chunk_rows, n_rows - start)
+            subject_lengths = rng.integers(3, 10, size=count)
+            resolution_lengths = rng.integers(15, 60, size=count)
+            word_ids = (rng.zipf(1.2, size=int(subject_lengths.sum() + resolution_lengths.sum())) - 1) % len(vocabulary)
+            words = vocabulary[word_ids]
+            offset = 0
+            for subject_length, resolution_length in zip(subject_lengths, resolution_lengths):
+                subject = " ".join(words[offset:offset + subject_length])
+                offset += subject_length
+                resolution = " ".join(words[offset:offset + resolution_length])
+                offset += resolution_length
+                writer.writerow([subject.capitalize(), resolution.capitalize() + "."])
+    os.replace(tmp_path, path)
+
+def load_threads(path, count, seed=0):
+    """
+    Load recorded threads, or build synthetic ones when no recording is given.
+
+    Returns:
+        list[dict]: Threads with 'subject' and 'email_thread'.
+    """
+    if path:
+        threads = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("email_thread"):
+                    threads.append({"subject": record.get("subject") or "", "email_thread": record["email_thread"]})
+        if not threads:
+            raise SystemExit(f"No threads with an 'email_thread' field in {path}.")
+        return threads[:count] if count else threads
+
+    phrases = load_boilerplate()
+    rng = np.random.default_rng(seed)
+    sizes_kb = [2, 5, 10, 25, 50]
+    return [
+        {
+            "subject": " ".join(rng.choice(IT_WORDS, size=rng.integers(3, 8))).capitalize(),
+            "email_thread": synthetic_thread(sizes_kb[i % len(sizes_kb)], phrases, seed=seed + i),
+        }
+        for i in range(count or 20)
+    ]
+
+def percentiles(values):
+    p50, p95 = np.percentile(values, [50, 95])
+    return p50, p95
+
+def run_size(n_rows, threads, args):
+    """
+    Benchmark the pipeline stages against a CSV with `n_rows` resolved tickets.
+
+    Returns:
+        dict: Report with the index timings and per-stage latency percentiles.
+    """
+    os.makedirs(args.data_dir, exist_ok=True)
+    csv_path = os.path.join(args.data_dir, f"resolved_tickets_{n_rows}.csv")
+    if not os.path.exists(csv_path):
+        start = time.perf_counter()
+        write_synthetic_csv(csv_path, n_rows, seed=args.seed)
+        print(f"Generated {csv_path} in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    index = TicketIndex(csv_path)
+    refreshed = index.refresh()
+    index_refresh_s = time.perf_counter() - start
+    start = time.perf_counter()
+    TicketIndex.open(csv_path)
+    index_open_s = time.perf_counter() - start
+
+    summarize = None
+    if args.summarize:
+        from summarizer import summarize_long_thread
+        summarize = summarize_long_thread
+    llm = None
+    if args.llm:
+        from ollama_client import BackgroundOllama
+        llm = BackgroundOllama(model=args.model, max_concurrency=1)
+
+    traces = []
+    for repeat in range(args.warmup + args.repeat):
+        for i, thread in enumerate(threads):
+            trace = TicketTrace(f"replay-{i}", path="")
+            with trace.span("clean"):
+                cleaned_thread = clean_text_for_ai(thread["email_thread"])
+            summarized_thread = cleaned_thread
+            if summarize:
+                with trace.span("summarize"):
+                    summarized_thread = summarize(cleaned_thread)
+            with trace.span("retrieve"):
+                similar_resolution = index.find_similar_ticket(thread["subject"], max_postings=args.max_postings)[1]
+            ai_reply = summarized_thread
+            if llm:
+                with trace.span("llm"):
+                    ai_reply = llm.generate(
+                        f"You are an IT Assistant. Based on the summarized email thread below, provide a solution to their email response. "
+                        f"Respond directly with the solution addressing the issue.\n\n"
+                        f"Summarized Email Thread:\n{summarized_thread}\n\n"
+                        f"Similar Past Resolution (if applicable): {similar_resolution}\n"
+                    )
+            with trace.span("compare"):
+                compare_ai_response_to_resolution(ai_reply, similar_resolution, index)
+            if repeat >= args.warmup:
+                traces.append(trace)
+    if llm:
+        llm.close()
+
+    stages = {}
+    totals = []
+    for trace in traces:
+        durations = trace.durations()
+        totals.append(sum(durations.values()))
+        for name, seconds in durations.items():
+            stages.setdefault(name, []).append(seconds)
+
+    report = {
+        "rows": n_rows,
+        "index": refreshed,
+        "index_refresh_s": round(index_refresh_s, 3),
+        "index_open_s": round(index_open_s, 3),
+        "threads": len(threads),
+        "runs": len(traces),
+        "stages": {},
+        "peak_rss_mb": peak_rss_mb() and round(peak_rss_mb(), 1),
+    }
+    for name, values in list(stages.items()) + [("total", totals)]:
+        p50, p95 = percentiles(values)
+        report["stages"][name] = {
+            "p50_ms": round(p50 * 1000, 3),
+            "p95_ms": round(p95 * 1000, 3),
+            "per_sec": round(len(values) / sum(values), 1) if sum(values) > 0 else None,
+        }
+    return report
+
+def print_report(report):
+    print(f"\n{report['rows']:,} resolved tickets: index {report['index']} in {report['index_refresh_s']:.2f}s, "
+          f"reopened in {report['index_open_s']:.2f}s, {report['runs']} replays, peak RSS {report['peak_rss_mb']} MB")
+    print(f"{'stage':>10} {'p50 ms':>10} {'p95 ms':>10} {'per sec':>10}")
+    for name, stats in report["stages"].items():
+        print(f"{name:>10} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} {stats['per_sec'] or 0:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000], help="Synthetic CSV sizes.")
+    parser.add_argument("--threads", default=None, help="JSON lines file of recorded threads (e.g. drafts.jsonl).")
+    parser.add_argument("--count", type=int, default=None, help="Replay at most this many threads (20 synthetic by default).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the threads.")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes before the timed ones.")
+    parser.add_argument("--max-postings", type=int, default=None, help="Approximate retrieval cap, as RETRIEVAL_MAX_POSTINGS.")
+    parser.add_argument("--summarize", action="store_true", help="Include BART summarization.")
+    parser.add_argument("--llm", action="store_true", help="Include reply generation (needs a running Ollama server).")
+    parser.add_argument("--model", default="llama3.2", help="Ollama model used with --llm.")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Where the synthetic CSVs and indexes are kept.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data.")
+    parser.add_argument("--output", default=None, help="Append one JSON report line per size to this file.")
+    args = parser.parse_args()
+
+    threads = load_threads(args.threads, args.count, seed=args.seed)
+    print(f"Replaying {len(threads)} threads ({sum(len(t['email_thread']) for t in threads) / 1e6:.1f} MB).")
+    for n_rows in args.rows:
+        report = run_size(n_rows, threads, args)
+        print_report(report)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report) + "\n")
+
+if __name__ == "__main__":
+    main()
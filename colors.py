@@ -0,0 +1,6 @@
+# ANSI color codes for formatted output
+GREEN = "\033[92m"
+RESET = "\033[0m"
+YELLOW = "\033[33m"
+BRIGHTMAGENTA = "\033[95m"
+RED = "\033[91m"
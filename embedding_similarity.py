@@ -0,0 +1,207 @@
+import os
+import json
+import threading
+import numpy as np
+from file_lock import file_lock
+from tfidf_similarity import TicketIndex
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+class EmbeddingIndex:
+    """
+    Dense-embedding retrieval over the resolved ticket subjects, as an alternative to TF-IDF.
+
+    Subjects are embedded in batches with a small CPU sentence-embedding model, L2-normalised and
+    stored as a float16 matrix that is memory-mapped at startup, so a lookup is one query embedding
+    plus a normalized dot product against the matrix. Rows follow a TicketIndex over the same CSV,
+    which supplies change detection and the subject/resolution text: tickets appended to the CSV
+    are embedded incrementally, and a rebuild of the TicketIndex triggers a full re-embedding.
+    Like the TicketIndex, the embeddings can be shared by several instances: changes are made under
+    an inter-process lock, starting from the manifest on disk.
+
+    Requires the optional `sentence-transformers` package.
+    """
+
+    def __init__(self, ticket_index, model_name=EMBEDDING_MODEL_NAME, batch_size=256, chunk_rows=65536):
+        """
+        Args:
+            ticket_index (TicketIndex): Index over the resolved tickets CSV the embeddings follow.
+            model_name (str): Sentence-transformers model used to embed subjects and queries.
+            batch_size (int): Number of subjects embedded per model call.
+            chunk_rows (int): Number of stored rows scored per matrix product at query time.
+        """
+        self.ticket_index = ticket_index
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.chunk_rows = chunk_rows
+        self.embeddings_path = os.path.join(ticket_index.index_dir, "embeddings.f16")
+        self.manifest_path = os.path.join(ticket_index.index_dir, "embeddings.json")
+        self.lock_path = os.path.join(ticket_index.index_dir, "embeddings.lock")
+        self.manifest = None
+        self.embeddings = None
+        self._model = None
+        # Guards the manifest and the embeddings matrix, which refresh swaps while other threads search
+        self._state_lock = threading.RLock()
+
+    @classmethod
+    def open(cls, csv_path, index_dir=None, **kwargs):
+        """
+        Open the embedding index for a CSV file, embedding any tickets that are not stored yet.
+
+        Returns:
+            EmbeddingIndex: The ready-to-query index.
+        """
+        index = cls(TicketIndex.open(csv_path, index_dir=index_dir), **kwargs)
+        index.refresh()
+        return index
+
+    @property
+    def model(self):
+        """The sentence-embedding model, loaded on first use."""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    def embed(self, texts):
+        """
+        Embed texts in batches.
+
+        Args:
+            texts (list[str]): Texts to embed.
+
+        Returns:
+            np.ndarray: L2-normalised float32 embeddings, one row per text.
+        """
+        return self.model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+    def refresh(self):
+        """
+        Bring the embeddings in line with the ticket index.
+
+        Returns:
+            str: 'unchanged', 'appended' or 'rebuilt' depending on how the loaded rows changed,
+            whether this instance did the work or picked up what another instance wrote.
+        """
+        # The ticket index is refreshed inside this lock, so embeddings written by any instance never
+        # run ahead of the ticket index that instance then loads
+        os.makedirs(self.ticket_index.index_dir, exist_ok=True)
+        with file_lock(self.lock_path):
+            self.ticket_index.refresh()
+            source = self.ticket_index.manifest
+            loaded = self.manifest
+            # Always start from the manifest on disk: another instance may already have embedded new rows
+            manifest = self._read_manifest()
+            result = "unchanged"
+            if (
+                manifest is None
+                or manifest["model_name"] != self.model_name
+                or manifest["build_sha256"] != source.get("build_sha256")
+                or manifest["n_rows"] > source["n_rows"]
+            ):
+                # A new, empty file instead of truncating one other instances may have mapped
+                tmp_path = f"{self.embeddings_path}.tmp"
+                with open(tmp_path, "wb"):
+                    pass
+                os.replace(tmp_path, self.embeddings_path)
+                manifest = {"model_name": self.model_name, "build_sha256": source.get("build_sha256"), "n_rows": 0, "dim": None}
+                result = "rebuilt"
+            elif loaded is not None and manifest != loaded:
+                result = "rebuilt" if manifest["build_sha256"] != loaded["build_sha256"] else "appended"
+
+            if manifest["n_rows"] < source["n_rows"]:
+                subjects = self.ticket_index.subjects
+                with open(self.embeddings_path, "r+b") as f:
+                    # Drop anything an interrupted append left past the rows the manifest records
+                    f.truncate(manifest["n_rows"] * (manifest["dim"] or 0) * 2)
+                    f.seek(0, os.SEEK_END)
+                    for start in range(manifest["n_rows"], source["n_rows"], self.batch_size * 16):
+                        end = min(start + self.batch_size * 16, source["n_rows"])
+                        vectors = self.embed([subjects[i] for i in range(start, end)])
+                        vectors.astype(np.float16).tofile(f)
+                        manifest["dim"] = vectors.shape[1]
+                manifest["n_rows"] = source["n_rows"]
+                result = "appended" if result == "unchanged" else result
+                self._write_manifest(manifest)
+
+            if self.embeddings is None or manifest != loaded:
+                with self._state_lock:
+                    self.manifest = manifest
+                    self._load()
+            return result
+
+    def search(self, query, k=5):
+        """
+        Find the top-k past tickets whose subjects are closest to the query in embedding space.
+
+        Args:
+            query (str): Text to search for, e.g. the new ticket's subject.
+            k (int): Number of candidates to return.
+
+        Returns:
+            list[dict]: Up to k candidates, best first, each with 'index', 'score', 'subject' and 'resolution'.
+        """
+        query_vector = self.embed([query])[0]
+        # Held so a refresh by another thread cannot swap the matrix out from under the row count
+        with self._state_lock:
+            n_rows = self.manifest["n_rows"]
+            if n_rows == 0:
+                return []
+            scores = np.empty(n_rows, dtype=np.float32)
+            for start in range(0, n_rows, self.chunk_rows):
+                chunk = self.embeddings[start:start + self.chunk_rows]
+                # float16 has no BLAS kernels, so each chunk is widened before the matrix-vector product
+                scores[start:start + len(chunk)] = chunk.astype(np.float32) @ query_vector
+            k = min(k, n_rows)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            with self.ticket_index._state_lock:
+                return [
+                    {
+                        "index": int(i),
+                        "score": float(scores[i]),
+                        "subject": self.ticket_index.subjects[int(i)],
+                        "resolution": self.ticket_index.resolutions[int(i)],
+                    }
+                    for i in top
+                ]
+
+    def find_similar_ticket(self, new_subject):
+        """
+        Find the most similar ticket to a new subject based on embedding similarity.
+
+        Args:
+            new_subject (str): The subject of the new ticket to find a similar ticket for.
+
+        Returns:
+            tuple: A tuple containing:
+                - subject (str): The subject of the most similar ticket.
+                - resolution (str): The resolution of the most similar ticket.
+        """
+        candidates = self.search(new_subject, k=1)
+        if candidates:
+            return candidates[0]["subject"], candidates[0]["resolution"]
+        with self.ticket_index._state_lock:
+            return self.ticket_index.subjects[0], self.ticket_index.resolutions[0]
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _load(self):
+        n_rows, dim = self.manifest["n_rows"], self.manifest["dim"]
+        if n_rows == 0:
+            self.embeddings = np.empty((0, dim or 0), dtype=np.float16)
+        else:
+            self.embeddings = np.memmap(self.embeddings_path, dtype=np.float16, mode="r", shape=(n_rows, dim))
@@ -0,0 +1,40 @@
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: lock the first byte of the file instead
+    fcntl = None
+    import msvcrt
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive lock on a lock file, blocking until it is free.
+
+    Each call opens the file anew, so the lock serializes threads of the same process as well as
+    separate processes. It is not re-entrant: acquiring it again while holding it deadlocks.
+
+    Args:
+        path (str): Path of the lock file; created if it does not exist.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after ten seconds, so keep retrying
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,51 @@
+import time
+import threading
+import importlib
+import contextlib
+from colors import RESET, YELLOW
+
+# (label, seconds, thread name) for every timed import, in the order they finished
+import_timings = []
+_timings_lock = threading.Lock()
+
+@contextlib.contextmanager
+def import_timer(label):
+    """
+    Context manager that records how long the import statements inside it took.
+
+    Args:
+        label (str): Name shown in the startup report, e.g. 'selenium'.
+    """
+    start = time.perf_counter()
+    yield
+    with _timings_lock:
+        import_timings.append((label, time.perf_counter() - start, threading.current_thread().name))
+
+def lazy_import(module_name):
+    """
+    Import a module on first use, recording the time of the import that actually loaded it.
+
+    Args:
+        module_name (str): Dotted module name, e.g. 'transformers'.
+
+    Returns:
+        module: The imported module.
+    """
+    with _timings_lock:
+        timed = any(label == module_name for label, _, _ in import_timings)
+    if timed:
+        return importlib.import_module(module_name)
+    with import_timer(module_name):
+        return importlib.import_module(module_name)
+
+def report_import_timings():
+    """
+    Print the time spent in each timed import, slowest first.
+
+    Imports running in different threads overlap, so the times can add up to more than the wall-clock startup time.
+    """
+    with _timings_lock:
+        timings = sorted(import_timings, key=lambda timing: -timing[1])
+    print(f"{YELLOW}Import times:{RESET}")
+    for label, seconds, thread_name in timings:
+        print(f"{YELLOW}  {label:<36} {seconds:>6.2f}s  ({thread_name}){RESET}")
@@ -1,58 +1,72 @@
 import os
 import time
-import re
 import pickle
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from transformers import BartForConditionalGeneration, BartTokenizer
+import threading
+import contextlib
+from concurrent.futures import Future
+from lazy_imports import import_timer, lazy_import, report_import_timings
+# Selenium is imported up front because logging in is the first thing a session does; transformers,
+# langchain_ollama, pandas and sklearn are imported on first use, off the login path
+with import_timer("selenium"):
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.keys import Keys
+    from waits import wait_for, document_ready, element_present, element_clickable, element_shown, element_stale, element_count_above, count_displayed, iframe_ready
 from dotenv import load_dotenv
-from langchain_ollama import OllamaLLM  
-from tfidf_similarity import load_ticket_data, vectorize_subjects, find_similar_ticket, compare_ai_response_to_resolution
-from selenium.webdriver.common.keys import Keys
-
-# ANSI color codes for formatted output
-GREEN = "\033[92m"
-RESET = "\033[0m"  
-YELLOW = "\033[33m"
-BRIGHTMAGENTA = "\033[95m"
-RED = "\033[91m"
-
-# Initialize the LLaMA model for generating AI responses
-model = OllamaLLM(model="llama3.2")
-
-def load_bart_model():
+from summarizer import BART_MODEL_NAME, summarize_long_thread, warm_up_summarizer
+from response_cache import ResponseCache
+from text_cleaner import clean_text_for_ai, clean_messages_for_ai
+from prefetch import TicketPrefetcher, preemptible
+from tracing import TicketTrace
+from colors import GREEN, RESET, YELLOW, BRIGHTMAGENTA, RED
+
+# LLaMA model for generating AI responses, created on first use by get_llm()
+OLLAMA_MODEL_NAME = "llama3.2"
+model = None
+_model_lock = threading.Lock()
+
+def get_llm():
     """
-    Load the BART model and tokenizer for text summarization.
+    Return the shared LangChain Ollama model, importing langchain_ollama and creating it on first use.
 
     Returns:
-        model: Loaded BART model for conditional generation.
-        tokenizer: Tokenizer associated with the BART model.
+        OllamaLLM: The model used by invoke_llama.
     """
-    model = BartForConditionalGeneration.from_pretrained("facebook/bart-large-cnn")
-    tokenizer = BartTokenizer.from_pretrained("facebook/bart-large-cnn")
-    return model, tokenizer
-
-def summarize_thread(thread_text, model, tokenizer, max_length=130):
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                model = lazy_import("langchain_ollama").OllamaLLM(model=OLLAMA_MODEL_NAME)
+    return model
+
+# Shared async Ollama client, created on first use when OLLAMA_CLIENT=async
+async_llm = None
+_async_llm_lock = threading.Lock()
+
+def get_async_llm():
     """
-    Summarize a given thread text using the BART model.
-
-    Args:
-        thread_text (str): Text of the email thread to be summarized.
-        model: BART model for summarization.
-        tokenizer: Tokenizer for the BART model.
-        max_length (int): Maximum length of the summary.
+    Return the process-wide pooled Ollama client, creating it on first use.
 
     Returns:
-        str: Summarized text.
+        BackgroundOllama: Client configured from OLLAMA_HOST, OLLAMA_PARALLEL, OLLAMA_TIMEOUT and OLLAMA_KEEP_ALIVE.
     """
-    inputs = tokenizer([thread_text], max_length=1024, return_tensors="pt", truncation=True)
-    summary_ids = model.generate(inputs["input_ids"], max_length=max_length, min_length=30, length_penalty=2.0, num_beams=4, early_stopping=True)
-    summary = tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-    return summary
+    global async_llm
+    if async_llm is None:
+        with _async_llm_lock:
+            if async_llm is None:
+                from ollama_client import BackgroundOllama
+                async_llm = BackgroundOllama(
+                    model=OLLAMA_MODEL_NAME,
+                    max_concurrency=int(os.getenv("OLLAMA_PARALLEL", "1")),
+                    timeout=float(os.getenv("OLLAMA_TIMEOUT", "120")),
+                    keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+                )
+    return async_llm
+
+# Per-generation latency records (time to first token, tokens/sec), newest last
+llm_stats = []
 
 def type_like_human(driver, element, text, delay=0.01):
     """
@@ -68,13 +82,93 @@ def type_like_human(driver, element, text, delay=0.01):
         element.send_keys(char)
         time.sleep(delay)
 
-def generate_reply_with_llama(summarized_thread, similar_resolution):
+# Inserts text at the end of a contenteditable element in one call. execCommand('insertText') goes
+# through the editor's normal input pipeline (beforeinput/input events, undo stack); if the editor
+# rejects it, the text is appended as text nodes and the input/change events are dispatched by hand.
+INSERT_TEXT_SCRIPT = """
+const element = arguments[0];
+const text = arguments[1];
+const doc = element.ownerDocument;
+const win = doc.defaultView;
+element.focus();
+const selection = win.getSelection();
+const range = doc.createRange();
+range.selectNodeContents(element);
+range.collapse(false);
+selection.removeAllRanges();
+selection.addRange(range);
+if (doc.execCommand('insertText', false, text)) {
+    return true;
+}
+text.split('\\n').forEach((line, idx) => {
+    if (idx > 0) {
+        element.appendChild(doc.createElement('br'));
+    }
+    element.appendChild(doc.createTextNode(line));
+});
+element.dispatchEvent(new win.InputEvent('input', {bubbles: true, inputType: 'insertText', data: text}));
+element.dispatchEvent(new win.Event('change', {bubbles: true}));
+return false;
+"""
+
+def insert_text_fast(driver, element, text):
+    """
+    Insert the whole text into an editor element in a single WebDriver round trip.
+
+    Args:
+        driver: Selenium WebDriver instance.
+        element: WebElement (contenteditable) to insert the text into.
+        text (str): Text to insert.
+    """
+    driver.execute_script(INSERT_TEXT_SCRIPT, element, text)
+
+def print_token(token):
+    """
+    Print a streamed token as soon as it arrives.
+
+    Args:
+        token (str): Text chunk produced by the model.
+    """
+    print(token, end="", flush=True)
+
+def invoke_llama(prompt, on_token=None):
+    """
+    Run a prompt through the LLaMA model, streaming tokens when LLM_STREAM is enabled (the default).
+
+    With OLLAMA_CLIENT=async the prompt goes through the shared pooled client instead, which always
+    streams and lets concurrent callers (prefetch, batch mode) share keep-alive connections.
+
+    Args:
+        prompt (str): Prompt to send to the model.
+        on_token (callable): Called with each text chunk as it arrives (or once with the full reply when not streaming).
+
+    Returns:
+        str: AI-generated reply text.
+    """
+    if os.getenv("OLLAMA_CLIENT", "langchain").lower() == "async":
+        # Prefetch drafts can be cancelled by the interactive session, which then runs first
+        return preemptible(get_async_llm().submit(prompt, on_token=on_token)).result()
+    if os.getenv("LLM_STREAM", "1").lower() in ("1", "true", "yes"):
+        chunks = []
+        for chunk in get_llm().stream(prompt):
+            chunks.append(chunk)
+            if on_token:
+                on_token(chunk)
+        return "".join(chunks)
+    result = get_llm().invoke(input=prompt)
+    reply = result.get("text", "No response generated.") if isinstance(result, dict) else result
+    if on_token:
+        on_token(reply)
+    return reply
+
+def generate_reply_with_llama(summarized_thread, similar_resolution, on_token=None):
     """
     Generate a reply using the LLaMA model based on the summarized thread and a similar resolution.
 
     Args:
         summarized_thread (str): Summarized email thread text.
         similar_resolution (str): Similar past resolution for reference.
+        on_token (callable): Called with each streamed text chunk as it arrives.
 
     Returns:
         str: AI-generated reply text.
@@ -86,16 +180,17 @@ def generate_reply_with_llama(summarized_thread, similar_resolution):
         f"Summarized Email Thread:\n{summarized_thread}\n\n"
         f"Similar Past Resolution (if applicable): {similar_resolution}\n"
     )
-    result = model.invoke(input=prompt)
-    return result.get("text", "No response generated.") if isinstance(result, dict) else result
+    return response_cache.get_or_compute("reply", prompt, OLLAMA_MODEL_NAME, {}, lambda: invoke_llama(prompt, on_token))
 
-def generate_reply_with_custom_input(user_input, similar_resolution):
+def generate_reply_with_custom_input(user_input, similar_resolution, summarized_thread="", on_token=None):
     """
     Generate a reply based on custom user input and a similar past resolution.
 
     Args:
         user_input (str): Custom user-provided text.
         similar_resolution (str): Similar past resolution for reference.
+        summarized_thread (str): Summarized email thread used as context.
+        on_token (callable): Called with each streamed text chunk as it arrives.
 
     Returns:
         str: AI-generated reply based on user input.
@@ -106,8 +201,73 @@ def generate_reply_with_custom_input(user_input, similar_resolution):
         f"please complete a professional response. "
         f"Do not include greetings, sign-offs, or explanations."
     )
-    result = model.invoke(input=prompt)
-    return result.get("text", "No response generated.") if isinstance(result, dict) else result
+    return response_cache.get_or_compute("reply", prompt, OLLAMA_MODEL_NAME, {}, lambda: invoke_llama(prompt, on_token))
+
+def timed_generation(generate, ticket_number, *args, on_token=None):
+    """
+    Run a reply generator and record its time to first token and tokens/sec in `llm_stats`.
+
+    Ollama streams roughly one token per chunk, so chunks are counted as tokens. Replies served
+    from the response cache produce no chunks and are not recorded.
+
+    Args:
+        generate (callable): generate_reply_with_llama or generate_reply_with_custom_input.
+        ticket_number (str): Ticket the reply is for, recorded alongside the latency stats.
+        *args: Arguments passed through to `generate`.
+        on_token (callable): Called with each streamed text chunk as it arrives.
+
+    Returns:
+        tuple: (reply, stats) where stats is None when the reply came from the cache.
+    """
+    start = time.perf_counter()
+    arrivals = []
+
+    def _record(token):
+        arrivals.append(time.perf_counter())
+        if on_token:
+            on_token(token)
+
+    reply = generate(*args, on_token=_record)
+    if not arrivals:
+        return reply, None
+    total_time = time.perf_counter() - start
+    generation_time = total_time - (arrivals[0] - start)
+    stats = {
+        "ticket": ticket_number,
+        "time_to_first_token": arrivals[0] - start,
+        "total_time": total_time,
+        "tokens": len(arrivals),
+        "tokens_per_sec": len(arrivals) / generation_time if generation_time > 0 else 0.0,
+    }
+    llm_stats.append(stats)
+    return reply, stats
+
+def stream_reply(generate, ticket_number, *args, span=None):
+    """
+    Run a reply generator, printing the reply as it streams and reporting its latency.
+
+    Args:
+        generate (callable): generate_reply_with_llama or generate_reply_with_custom_input.
+        ticket_number (str): Ticket the reply is for, recorded alongside the latency stats.
+        *args: Arguments passed through to `generate`.
+        span (dict): Trace span that receives the latency stats (and 'cached' for cache hits).
+
+    Returns:
+        str: AI-generated reply text.
+    """
+    ai_reply, stats = timed_generation(generate, ticket_number, *args, on_token=print_token)
+    print()
+    if span is not None:
+        span["cached"] = stats is None
+        if stats is not None:
+            span.update({key: stats[key] for key in ("time_to_first_token", "tokens", "tokens_per_sec")})
+    if stats is None:
+        # Served from the response cache, so nothing was streamed
+        print(ai_reply)
+        return ai_reply
+    print(f"{YELLOW}Time to first token: {stats['time_to_first_token']:.2f}s, "
+          f"{stats['tokens']} tokens at {stats['tokens_per_sec']:.1f} tokens/s ({stats['total_time']:.2f}s total){RESET}")
+    return ai_reply
 
 def scrape_subject(driver):
     """
@@ -120,9 +280,7 @@ def scrape_subject(driver):
         str: Subject of the ticket or None if not found.
     """
     try:
-        subject = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.XPATH, "//*[@id='details_inner_title']/div[3]/h1"))
-        ).text
+        subject = wait_for(driver, element_present((By.XPATH, "//*[@id='details_inner_title']/div[3]/h1")), "ticket subject").text
         print(f"Scraped Subject: {subject}")
         return subject
     except Exception as e:
@@ -133,26 +291,29 @@ def type_reply_in_iframe(driver, ai_reply):
     """
     Type the AI-generated reply into an iframe within the ticketing system.
 
+    The reply is inserted in one operation unless TYPING_MODE selects the slower 'send_keys' or 'human' paths.
+
     Args:
         driver: Selenium WebDriver instance.
         ai_reply (str): Reply text generated by the AI.
     """
     try:
-        iframe = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "iframe.ze_area"))
-        )
+        iframe = wait_for(driver, iframe_ready((By.CSS_SELECTOR, "iframe.ze_area")), "reply editor iframe", timeout=10)
         print("Switching to the iframe with class 'ze_area'.")
         driver.switch_to.frame(iframe)
 
-        reply_box = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "/html/body/div[3]"))
-        )
+        reply_box = wait_for(driver, element_present((By.XPATH, "/html/body/div[3]")), "reply box inside the iframe", timeout=10)
         print("Located the div element '/html/body/div[3]' inside the iframe.")
 
-        reply_box.send_keys(Keys.END)
-        reply_box.send_keys(Keys.ENTER)
-        reply_box.send_keys(Keys.ENTER)
-        type_like_human(driver, reply_box, ai_reply)
+        reply_box.send_keys(Keys.END, Keys.ENTER, Keys.ENTER)
+        # TYPING_MODE: 'fast' (default, one script call), 'send_keys' (one send_keys call) or 'human' (per character)
+        typing_mode = os.getenv("TYPING_MODE", "fast").lower()
+        if typing_mode == "human":
+            type_like_human(driver, reply_box, ai_reply)
+        elif typing_mode == "send_keys":
+            reply_box.send_keys(ai_reply)
+        else:
+            insert_text_fast(driver, reply_box, ai_reply)
         print("Successfully input the reply after two line breaks.")
 
         driver.switch_to.default_content()
@@ -161,43 +322,9 @@ def type_reply_in_iframe(driver, ai_reply):
         print(f"Could not interact with the div inside the iframe. Error: {e}")
         driver.switch_to.default_content()
 
-def clean_text_for_ai(text):
-    """
-    Clean redundant text from the email thread to improve AI processing.
-
-    Args:
-        text (str): Raw text of the email thread.
-
-    Returns:
-        str: Cleaned text with redundant information removed.
-    """
-    redundant_texts = [
-        "We recognize that many Indigenous Nations have longstanding relationships with the territories",
-        "Acknowledges its presence on the traditional territory of many Indigenous Nations",
-        "This electronic mail (e-mail), including any attachments, is intended only for the recipient(s)",
-        "Any unauthorized use, dissemination or copying is strictly prohibited",
-        "If you have received this e-mail in error, or are not named as a recipient",
-        "Kind regards,", "Best regards,", "Warm regards,", "Sincerely,",
-        "School of Engineering", "Helpdesk Coordinator", "Cross-Campus Capstone Classroom",
-        "VACATION NOTICE", "zoom.us", "email@domain.com", "website.domain", "UNIVERSITY", 
-        "4700 Keele Street Toronto ON, Canada M3J 1P3", "The area known as Tkaronto has been care taken by the",
-        "Mississaugas of the Credit First Nation", "Dish with One Spoon Wampum Belt Covenant", "privileged, confidential and/or exempt from disclosure"
-    ]
-    for redundant_text in redundant_texts:
-        text = text.replace(redundant_text, "")
-    text = re.sub(r"\n+", "\n", text)
-    text = re.sub(r"\s{2,}", " ", text)
-    seen_lines = set()
-    cleaned_lines = []
-    for line in text.splitlines():
-        line_lower = line.strip().lower()
-        if line_lower and line_lower not in seen_lines:
-            seen_lines.add(line_lower)
-            cleaned_lines.append(line.strip())
-    cleaned_text = "\n".join(cleaned_lines)
-    cleaned_text = re.sub(r"(Hello,)+", "Regards,", cleaned_text)
-    cleaned_text = re.sub(r"(Thank you,)+", "Thank you,", cleaned_text)
-    return cleaned_text.strip()
+# Conversation bodies (notiDesc_) and notes (note_) of the open ticket
+THREAD_SELECTOR = "div[id^='notiDesc_'], div[id^='note_']"
+THREAD_ELEMENTS = (By.CSS_SELECTOR, THREAD_SELECTOR)
 
 def open_closed_elements(driver):
     """
@@ -211,21 +338,64 @@ def open_closed_elements(driver):
         for idx, conv_head in enumerate(conversation_heads[1:], start=2):
             try:
                 print(f"Clicking conversation thread {idx}...")
+                shown_before = count_displayed(driver, THREAD_SELECTOR)
                 conv_head.click()
-                time.sleep(2)
+                wait_for(driver, element_count_above(THREAD_SELECTOR, shown_before), f"conversation thread {idx} to expand", timeout=5, required=False)
             except Exception as e:
                 print(f"Error opening conversation thread {idx}: {e}")
 
-    notes = driver.find_elements(By.XPATH, "//div[starts-with(@id, 'notiDesc_') or starts-with(@id, 'note_')]")
+    notes = driver.find_elements(*THREAD_ELEMENTS)
     for idx, note in enumerate(notes):
         try:
             if "display: none;" in note.get_attribute("style"):
                 conversation_head = note.find_element(By.XPATH, ".//preceding-sibling::div[contains(@class, 'conversation-head')]")
                 conversation_head.click()
-                time.sleep(2)
+                wait_for(driver, element_shown(note), f"note {idx + 1} to open", timeout=5, required=False)
         except Exception as e:
             print(f"Error opening note {idx + 1}: {e}")
 
+# Collects the text of every conversation (notiDesc_) and note (note_) in document order, reading
+# inside shadow roots, and drops text blocks that were already seen earlier in the thread.
+SCRAPE_THREAD_SCRIPT = """
+const seen = new Set();
+const messages = [];
+document.querySelectorAll("div[id^='notiDesc_'], div[id^='note_']").forEach(element => {
+    const nodes = element.shadowRoot ? element.shadowRoot.querySelectorAll('div, span, p') : [element];
+    const parts = [];
+    nodes.forEach(node => {
+        const text = (node.innerText || node.textContent || '').trim();
+        if (text && !seen.has(text)) {
+            seen.add(text);
+            parts.push(text);
+        }
+    });
+    if (parts.length) {
+        messages.push({
+            id: element.id,
+            kind: element.id.includes('note_') ? 'note' : 'email',
+            text: parts.join('\\n'),
+        });
+    }
+});
+return messages;
+"""
+
+def scrape_thread(driver):
+    """
+    Extract all conversation and note text of the open ticket in a single script call.
+
+    Args:
+        driver: Selenium WebDriver instance.
+
+    Returns:
+        list[dict]: Messages in page order, each with 'id', 'kind' ('email' or 'note') and 'text'.
+    """
+    try:
+        return driver.execute_script(SCRAPE_THREAD_SCRIPT) or []
+    except Exception as e:
+        print(f"Error scraping thread: {e}")
+        return []
+
 def click_reply_or_reply_all(driver):
     """
     Attempt to click either the 'Reply All' button or fallback to the 'Reply' button if 'Reply All' is not found.
@@ -234,170 +404,447 @@ def click_reply_or_reply_all(driver):
         driver: Selenium WebDriver instance.
     """
     try:
-        reply_all_button = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.XPATH, "//button[contains(@class, 'new-inc-btn') and .//span[text()='Reply All']]"))
-        )
+        reply_all_locator = (By.XPATH, "//button[contains(@class, 'new-inc-btn') and .//span[text()='Reply All']]")
+        reply_all_button = wait_for(driver, element_present(reply_all_locator), "'Reply All' button")
         driver.execute_script("arguments[0].scrollIntoView(true);", reply_all_button)
-        time.sleep(1)
+        wait_for(driver, element_clickable(reply_all_locator), "'Reply All' button to be clickable", timeout=5, required=False)
         driver.execute_script("arguments[0].click();", reply_all_button)
         print("Clicked 'Reply All' button.")
     except Exception as e:
         print("Reply All button not found, trying Reply...")
 
         try:
-            reply_button = WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.XPATH, "//button[contains(@class, 'new-inc-btn') and .//span[text()='Reply']]"))
-            )
+            reply_locator = (By.XPATH, "//button[contains(@class, 'new-inc-btn') and .//span[text()='Reply']]")
+            reply_button = wait_for(driver, element_present(reply_locator), "'Reply' button")
             driver.execute_script("arguments[0].scrollIntoView(true);", reply_button)
-            time.sleep(1)
+            wait_for(driver, element_clickable(reply_locator), "'Reply' button to be clickable", timeout=5, required=False)
             driver.execute_script("arguments[0].click();", reply_button)
             print("Clicked 'Reply' button.")
         except Exception as e:
             print(f"Neither 'Reply' nor 'Reply All' button could be found: {e}")
 
-# Load environment variables from .env file
-load_dotenv()
+REQUESTS_URL = "https://ask2lit.lassonde.yorku.ca/app/itdesk/ui/requests"
 
+def requests_url():
+    """
+    Return the request list URL, overridable with HELPDESK_URL (e.g. a local HTML fixture).
+    """
+    return os.getenv("HELPDESK_URL", REQUESTS_URL)
 
-current_directory = os.getcwd()
-chromedriver_path = os.path.join(current_directory, "chromedriver")
-service = Service(executable_path=chromedriver_path)
-driver = webdriver.Chrome(service=service)
+def create_driver(headless=False):
+    """
+    Start a Chrome session using the chromedriver in the current directory.
 
-driver.get("https://ask2lit.lassonde.yorku.ca/app/itdesk/ui/requests")
-time.sleep(5)
+    Args:
+        headless (bool): Run Chrome without a visible window.
 
-email = os.getenv("LOGIN_EMAIL")
-password = os.getenv("LOGIN_PASSWORD")
+    Returns:
+        webdriver.Chrome: The new WebDriver instance.
+    """
+    chromedriver_path = os.path.join(os.getcwd(), "chromedriver")
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    return webdriver.Chrome(service=Service(executable_path=chromedriver_path), options=options)
 
-email_input = driver.find_element(By.ID, "login_id")
-email_input.send_keys(email)
+def login(driver):
+    """
+    Log in to the helpdesk with LOGIN_EMAIL and LOGIN_PASSWORD from the environment.
 
-button = driver.find_element(By.ID, "nextbtn")
-button.click()
+    Args:
+        driver: Selenium WebDriver instance.
+    """
+    driver.get(requests_url())
+
+    email_input = wait_for(driver, element_clickable((By.ID, "login_id")), "login page", timeout=30)
+    email_input.send_keys(os.getenv("LOGIN_EMAIL"))
+    driver.find_element(By.ID, "nextbtn").click()
+
+    password_field = wait_for(driver, element_clickable((By.ID, "password")), "password field", timeout=30)
+    password_field.send_keys(os.getenv("LOGIN_PASSWORD"))
+    driver.find_element(By.ID, "nextbtn").click()
+
+    wait_for(driver, element_stale(password_field), "login to complete", timeout=30)
+
+# Reads every request list row in one round trip. The selectors mirror the XPaths the row scan used
+# to run per row: [class*=...] is contains(@class, ...) and [class='...'] is @class='...'.
+SCRAPE_TICKETS_SCRIPT = """
+const rows = document.querySelectorAll("tr[class*='sdpTable requestlistview_row']");
+const text = (row, selector) => {
+    const element = row.querySelector(selector);
+    return element ? element.innerText.trim() : null;
+};
+return Array.from(rows, row => {
+    const statusSpan = Array.from(row.querySelectorAll("td[class*='evenRow'] span"))
+        .find(span => ['Resolved', 'Closed'].includes(span.textContent.trim()));
+    let replyState = null;
+    if (row.querySelector("div[class*='listicon replyicon_REQ_REPLY']")) {
+        replyState = 'replied';
+    } else if (row.querySelector("div[class='listicon replyicon_null']")) {
+        replyState = 'none';
+    }
+    return {
+        number: text(row, "span[class='listview-display-id']"),
+        subject: text(row, "td[class*='wo-subject']"),
+        technician_or_status: text(row, "td[title]"),
+        status: statusSpan ? statusSpan.textContent.trim() : 'Open',
+        reply_state: replyState,
+    };
+});
+"""
 
-time.sleep(5)
-password_field = driver.find_element(By.ID, "password")
-password_field.send_keys(password)
-button = driver.find_element(By.ID, "nextbtn")
-button.click()
+def scrape_tickets(driver):
+    """
+    Read every row of the request list in a single script call.
 
-time.sleep(5)
+    Args:
+        driver: Selenium WebDriver instance.
 
-def scrape_tickets(driver):
-    WebDriverWait(driver, 30).until(
-        EC.visibility_of_element_located((By.XPATH, "//tr[contains(@class, 'sdpTable requestlistview_row')]"))
-    )
+    Returns:
+        list[dict]: One record per row with 'number', 'subject', 'technician_or_status',
+        'status' ('Open', 'Resolved' or 'Closed') and 'reply_state' ('replied', 'none' or None).
+    """
+    wait_for(driver, EC.visibility_of_element_located((By.XPATH, "//tr[contains(@class, 'sdpTable requestlistview_row')]")), "request list rows", timeout=30)
     print("Table rows are now visible, proceeding to read the data.")
-    ticket_rows = driver.find_elements(By.XPATH, "//tr[contains(@class, 'sdpTable requestlistview_row')]")
-    return ticket_rows
+    return driver.execute_script(SCRAPE_TICKETS_SCRIPT)
+
+def is_open_ticket(ticket):
+    """
+    Check whether a scraped ticket still needs a reply.
+
+    Args:
+        ticket (dict): Ticket record returned by scrape_tickets.
+
+    Returns:
+        bool: True if the ticket has a reply icon and is neither resolved nor closed.
+    """
+    return ticket["reply_state"] is not None and ticket["status"] not in ("Resolved", "Closed") and bool(ticket["number"])
+
+def open_ticket(driver, ticket_number):
+    """
+    Click a ticket in the request list and wait for its page to load.
+
+    Args:
+        driver: Selenium WebDriver instance showing the request list.
+        ticket_number (str): Display id of the ticket to open.
+    """
+    ticket_link = driver.find_element(By.XPATH, f"//span[@class='listview-display-id' and text()='{ticket_number}']")
+    ticket_link.click()
+    print(f"Successfully clicked on ticket {ticket_number}.")
+    wait_for(driver, element_stale(ticket_link), "ticket page to open", timeout=15, required=False)
+    wait_for(driver, document_ready(), "ticket page to load", timeout=15)
+
+def fetch_ticket(driver, ticket_number):
+    """
+    Open a ticket from the request list and scrape its subject and full thread.
+
+    Args:
+        driver: Selenium WebDriver instance showing the request list.
+        ticket_number (str): Display id of the ticket to open.
+
+    Returns:
+        dict: 'subject', 'messages' (as returned by scrape_thread) and 'email_thread' (the joined message text).
+    """
+    open_ticket(driver, ticket_number)
+    subject = scrape_subject(driver)
+    open_closed_elements(driver)
+    messages = scrape_thread(driver)
+    return {
+        "subject": subject,
+        "messages": messages,
+        "email_thread": "\n".join(message["text"] for message in messages),
+    }
+
+def clean_ticket(ticket):
+    """
+    Clean a fetched ticket's thread, keeping the message boundaries the summarizer chunks on.
+
+    Args:
+        ticket (dict): Ticket as returned by fetch_ticket; one with only an 'email_thread' is cleaned as a single message.
+
+    Returns:
+        str: The cleaned thread.
+    """
+    if ticket.get("messages"):
+        return clean_messages_for_ai([message["text"] for message in ticket["messages"]])
+    return clean_text_for_ai(ticket["email_thread"])
 
-while True:
+def summarize_cached(cleaned_thread):
+    """
+    Summarize a cleaned thread of any length, reusing the cached summary when the thread has not changed.
+    """
+    return response_cache.get_or_compute(
+        "summary", cleaned_thread, BART_MODEL_NAME, {"max_length": 130, "num_beams": 4, "mode": "chunked"},
+        lambda: summarize_long_thread(cleaned_thread, cache=response_cache),
+    )
+
+def retrieve_resolution(subject):
+    """
+    Find the resolution of the most similar past ticket, reusing the cached lookup for the current index.
+    """
+    # RETRIEVAL_MAX_POSTINGS caps the postings read per subject term (approximate search); unset searches exactly
+    max_postings = int(os.getenv("RETRIEVAL_MAX_POSTINGS", "0")) or None
+    if embedding_index is not None:
+        return response_cache.get_or_compute(
+            "resolution", subject, embedding_index.model_name, {"index": ticket_index.manifest["csv_sha256"]},
+            lambda: embedding_index.find_similar_ticket(subject)[1],
+        )
+    return response_cache.get_or_compute(
+        "resolution", subject, "tfidf", {"index": ticket_index.manifest["csv_sha256"], "max_postings": max_postings},
+        lambda: ticket_index.find_similar_ticket(subject, max_postings=max_postings)[1],
+    )
+
+def fetch_from_list(driver, ticket_number):
+    """
+    Fetch a ticket's thread, then return the session to the request list for the next ticket.
+
+    Args:
+        driver: Selenium WebDriver instance showing the request list.
+        ticket_number (str): Display id of the ticket to fetch.
+
+    Returns:
+        dict: The fields returned by fetch_ticket.
+    """
     try:
-        ticket_rows = scrape_tickets(driver)
-    except Exception as e:
-        print(f"Error: The table rows did not load in time. {e}")
-        driver.quit()
-        exit()
+        return fetch_ticket(driver, ticket_number)
+    finally:
+        driver.get(requests_url())
+        scrape_tickets(driver)
+
+# Drafting pipeline shared by prefetch and batch mode; each stage returns the fields it adds to the
+# draft, and the flag marks stages that call the LLM
+DRAFT_STAGES = [
+    ("clean", lambda draft: {"cleaned_thread": clean_ticket(draft)}, False),
+    ("summarize", lambda draft: {"summarized_thread": summarize_cached(draft["cleaned_thread"])}, False),
+    ("retrieve", lambda draft: {"similar_resolution": retrieve_resolution(draft["subject"])}, False),
+    ("draft", lambda draft: {"ai_reply": timed_generation(generate_reply_with_llama, draft["number"], draft["summarized_thread"], draft["similar_resolution"])[0]}, True),
+]
+
+# Shared state set up by init_pipeline()
+ticket_index = None
+embedding_index = None
+response_cache = None
+
+def init_pipeline(warm_up=True):
+    """
+    Load the environment, the resolved tickets index and the response cache (once per process).
 
-    if len(ticket_rows) > 0:
-        for row in ticket_rows:
-            try:
-                reply_icon = row.find_elements(By.XPATH, ".//div[contains(@class, 'listicon replyicon_REQ_REPLY')]")
-                resolved_or_closed = row.find_elements(By.XPATH, ".//td[contains(@class, 'evenRow')]//span[text()='Resolved' or text()='Closed']")
-                reply_icon_null = row.find_elements(By.XPATH, ".//div[@class='listicon replyicon_null']")
-
-                if (reply_icon or reply_icon_null) and not resolved_or_closed:
-                    ticket_number = row.find_element(By.XPATH, ".//span[@class='listview-display-id']").text
-                    subject = row.find_element(By.XPATH, ".//td[contains(@class, 'wo-subject')]").text
-                    technician_or_status = row.find_element(By.XPATH, ".//td[@title]").text
-                    
-                    print(f"Ticket Number: {ticket_number}, Subject: {subject}, Technician/Status: {technician_or_status}")
-                    
-            except Exception as e:
-                print(f"Error processing row: {e}")
-    else:
-        print("No rows found.")
+    Args:
+        warm_up (bool): Also load the summarizer, in parallel with the index, and return once both are ready.
+    """
+    global ticket_index, embedding_index, response_cache
+    if ticket_index is not None:
+        return
+    start = time.perf_counter()
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    warm_up_thread = None
+    if warm_up:
+        # Load the summarizer in its own thread while the index is opened below
+        warm_up_thread = warm_up_summarizer()
+        if os.getenv("OLLAMA_CLIENT", "langchain").lower() == "async":
+            # Have Ollama load the model now and keep it resident between tickets
+            get_async_llm().warm_up().add_done_callback(report_llm_warm_up)
+
+    # The index's dependencies are imported one by one so the startup report breaks their cost down
+    for module_name in ("pandas", "scipy.sparse", "sklearn.feature_extraction.text", "tfidf_similarity"):
+        lazy_import(module_name)
+
+    # Build (or memory-map) the resolved tickets index once instead of refitting it for every ticket
+    ticket_index = lazy_import("tfidf_similarity").TicketIndex.open(os.getenv("RESOLVED_TICKETS_CSV", "resolved_tickets.csv"))
+
+    # RETRIEVAL_BACKEND=embedding matches subjects with a sentence-embedding model instead of TF-IDF
+    if os.getenv("RETRIEVAL_BACKEND", "tfidf").lower() == "embedding":
+        from embedding_similarity import EmbeddingIndex
+        embedding_index = EmbeddingIndex(ticket_index)
+        embedding_index.refresh()
+
+    # Reopened or re-prompted tickets reuse earlier summaries, resolutions and replies
+    response_cache = ResponseCache(
+        os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3"),
+        max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    )
+    if warm_up_thread is not None:
+        warm_up_thread.join()
+    print(f"{YELLOW}Pipeline ready in {time.perf_counter() - start:.2f}s.{RESET}")
+    report_import_timings()
 
-    ticket_to_ans = input(f"\n{YELLOW}Enter the ticket number you would like the AI to reply to or type 'exit' to quit: {RESET}").strip()
+def report_llm_warm_up(future):
+    """
+    Done-callback for the Ollama warm-up: report a server that could not be reached or failed to load the model.
+    """
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        print(f"{RED}Could not load {OLLAMA_MODEL_NAME} in Ollama: {error}{RESET}")
+
+def start_pipeline(warm_up=True):
+    """
+    Run init_pipeline in a background thread, so loading the models and the index overlaps with the browser login.
 
-    if ticket_to_ans.lower() == "exit":
-        print("Exiting the ticket answering system.")
+    Args:
+        warm_up (bool): Passed to init_pipeline.
+
+    Returns:
+        concurrent.futures.Future: Resolves once the pipeline is ready, or raises what init_pipeline raised.
+    """
+    ready = Future()
+
+    def _init():
+        try:
+            init_pipeline(warm_up=warm_up)
+        except BaseException as e:
+            ready.set_exception(e)
+        else:
+            ready.set_result(None)
+
+    threading.Thread(target=_init, name="pipeline-init", daemon=True).start()
+    return ready
+
+def main():
+    """
+    Run the interactive ticket answering session.
+    """
+    # Loaded here as well because login needs the credentials before the pipeline has finished loading
+    load_dotenv()
+    pipeline_ready = start_pipeline()
+    driver = create_driver()
+    login(driver)
+
+    prefetcher = None
+
+    def quit_session():
         driver.quit()
-        break
+        if prefetcher:
+            prefetcher.shutdown()
+            prefetch_driver.quit()
 
-    try:
-        ticket_link = driver.find_element(By.XPATH, f"//span[@class='listview-display-id' and text()='{ticket_to_ans}']")
-        ticket_link.click()
-        print(f"Successfully clicked on ticket {ticket_to_ans}.")
-        time.sleep(5)
-
-        subject = scrape_subject(driver)
-        open_closed_elements(driver)
-        elements_to_scrape = driver.find_elements(By.XPATH, "//div[starts-with(@id, 'notiDesc_') or starts-with(@id, 'note_')]")
-
-        if elements_to_scrape:
-            print(f"Found {len(elements_to_scrape)} elements (notiDesc or notes).")
-            email_thread = ""
-            unique_texts = set()
-            for idx, element in enumerate(elements_to_scrape):
-                print(f"Processing element {idx + 1}...")
-                is_note = "note_" in element.get_attribute("id")
-                if is_note:
-                    print("\n--- Note ---\n")
-                try:
-                    shadow_root = driver.execute_script("return arguments[0].shadowRoot", element)
-                    if shadow_root:
-                        shadow_elements = shadow_root.find_elements(By.CSS_SELECTOR, "div, span, p")
-                        for shadow_element in shadow_elements:
-                            text = shadow_element.text.strip()
-                            if text and text not in unique_texts:
-                                unique_texts.add(text)
-                                email_thread += f"{text}\n"
-                    else:
-                        note_text = element.text.strip()
-                        if note_text and note_text not in unique_texts:
-                            unique_texts.add(note_text)
-                            email_thread += f"{note_text}\n"
-                except Exception as e:
-                    print(f"Error processing element {idx + 1}: {e}")
-
-            cleaned_thread = clean_text_for_ai(email_thread)
-            bart_model, bart_tokenizer = load_bart_model()
-            summarized_thread = summarize_thread(cleaned_thread, bart_model, bart_tokenizer)
-
-            df = load_ticket_data('resolved_tickets.csv')
-            tfidf_matrix, vectorizer = vectorize_subjects(df)
-            
-            _, similar_resolution = find_similar_ticket(subject, tfidf_matrix, df, vectorizer)
-
-            ai_reply = generate_reply_with_llama(summarized_thread, similar_resolution)
-            print(f"\nAI Response:\n{ai_reply}")
-            similarity_score = compare_ai_response_to_resolution(ai_reply, similar_resolution, df)
-            print(f"{GREEN}AI Response Similarity Score: {similarity_score:.2f}%{RESET}")
-
-            user_choice = input(f"{BRIGHTMAGENTA}Do you want to use the AI-generated response? (yes/no): {RESET}").strip().lower()
-
-            if user_choice == 'yes':
-                similarity_score = compare_ai_response_to_resolution(ai_reply, similar_resolution, df)
-                print(f"{GREEN}AI Response Similarity Score: {similarity_score:.2f}%{RESET}")
-            elif user_choice == 'no':
-                user_input = input(f"{YELLOW}Please enter your input, and the AI will complete it: {RESET}").strip()
-                ai_reply = generate_reply_with_custom_input(user_input, similar_resolution)
-                print(f"\nAI Response with User Input:\n{ai_reply}")
-
-            click_reply_or_reply_all(driver)
-            type_reply_in_iframe(driver, ai_reply)
-
-            exit_after_reply = input(f"Type '{RED}exit{RESET}' to return to the requests page or '{RED}quit{RESET}' to end the session: ").strip()
-
-            if exit_after_reply.lower() == 'quit':
-                print("Exiting the system.")
-                driver.quit()
-                break
-            elif exit_after_reply.lower() == 'exit':
-                driver.get("https://ask2lit.lassonde.yorku.ca/app/itdesk/ui/requests")
-                ticket_rows = scrape_tickets(driver)  
+    # Waits for the pipeline to load; if it failed (e.g. a missing resolved tickets CSV) the browser
+    # sessions are closed and False is returned
+    def wait_for_pipeline():
+        try:
+            pipeline_ready.result()
+            return True
+        except Exception as e:
+            print(f"Error: Could not load the summarizer or the resolved tickets index. {e}")
+            quit_session()
+            return False
+
+    # PREFETCH=1 drafts replies for open tickets in the background using a second, headless browser session
+    if os.getenv("PREFETCH", "0").lower() in ("1", "true", "yes"):
+        if not wait_for_pipeline():
+            return
+        prefetch_driver = create_driver(headless=True)
+        login(prefetch_driver)
+        prefetcher = TicketPrefetcher(
+            lambda ticket: fetch_from_list(prefetch_driver, ticket["number"]),
+            DRAFT_STAGES,
+            max_workers=int(os.getenv("PREFETCH_WORKERS", "0")) or None,
+            llm_slots=int(os.getenv("OLLAMA_PARALLEL", "1")),
+        )
 
-    except Exception as e:
-        print(f"Error: Could not navigate to ticket {ticket_to_ans} or scrape the data. {e}")
+    while True:
+        try:
+            tickets = scrape_tickets(driver)
+        except Exception as e:
+            print(f"Error: The table rows did not load in time. {e}")
+            quit_session()
+            return
+
+        if len(tickets) > 0:
+            open_tickets = list(filter(is_open_ticket, tickets))
+            if prefetcher:
+                prefetcher.enqueue(open_tickets)
+            for ticket in open_tickets:
+                draft_status = f", Draft: {prefetcher.status(ticket['number'])}" if prefetcher else ""
+                print(f"Ticket Number: {ticket['number']}, Subject: {ticket['subject']}, Technician/Status: {ticket['technician_or_status']}{draft_status}")
+        else:
+            print("No rows found.")
+
+        ticket_to_ans = input(f"\n{YELLOW}Enter the ticket number you would like the AI to reply to or type 'exit' to quit: {RESET}").strip()
+
+        if ticket_to_ans.lower() == "exit":
+            print("Exiting the ticket answering system.")
+            quit_session()
+            break
+
+        # The request list can be browsed while the pipeline is still loading; drafting waits for it
+        if not pipeline_ready.done():
+            print(f"{YELLOW}Waiting for the summarizer and resolved tickets index to finish loading...{RESET}")
+        if not wait_for_pipeline():
+            return
+
+        # One JSON line per ticket with the time and memory high-water mark of each stage; time spent
+        # waiting at the prompts below counts towards the total but not towards any stage
+        trace = TicketTrace(ticket_to_ans, mode="interactive")
+        try:
+            with trace.span("scrape") as span:
+                ticket = fetch_ticket(driver, ticket_to_ans)
+                span["messages"] = len(ticket["messages"])
+            subject, messages = ticket["subject"], ticket["messages"]
+
+            if messages:
+                note_count = sum(1 for message in messages if message["kind"] == "note")
+                print(f"Found {len(messages)} messages ({len(messages) - note_count} emails, {note_count} notes).")
+
+                # Background drafting pauses while the operator's ticket is processed and the LLM
+                # calls take every LLM slot; a prefetched draft for the same thread is picked up
+                # through the response cache
+                with prefetcher.interactive() if prefetcher else contextlib.nullcontext():
+                    with trace.span("clean", chars=len(ticket["email_thread"])):
+                        cleaned_thread = clean_ticket(ticket)
+                    with trace.span("summarize", chars=len(cleaned_thread)):
+                        summarized_thread = summarize_cached(cleaned_thread)
+
+                    with trace.span("retrieve"):
+                        # Picks up tickets appended to the CSV since the last reply without a full refit
+                        (embedding_index or ticket_index).refresh()
+                        similar_resolution = retrieve_resolution(subject)
+
+                    print("\nAI Response:")
+                    with prefetcher.interactive_llm() if prefetcher else contextlib.nullcontext(), trace.span("llm") as span:
+                        ai_reply = stream_reply(generate_reply_with_llama, ticket_to_ans, summarized_thread, similar_resolution, span=span)
+                    with trace.span("compare"):
+                        similarity_score = lazy_import("tfidf_similarity").compare_ai_response_to_resolution(ai_reply, similar_resolution, ticket_index)
+                    print(f"{GREEN}AI Response Similarity Score: {similarity_score:.2f}%{RESET}")
+
+                user_choice = input(f"{BRIGHTMAGENTA}Do you want to use the AI-generated response? (yes/no): {RESET}").strip().lower()
+
+                if user_choice == 'yes':
+                    print(f"{GREEN}AI Response Similarity Score: {similarity_score:.2f}%{RESET}")
+                elif user_choice == 'no':
+                    user_input = input(f"{YELLOW}Please enter your input, and the AI will complete it: {RESET}").strip()
+                    print("\nAI Response with User Input:")
+                    with prefetcher.interactive_llm() if prefetcher else contextlib.nullcontext(), trace.span("llm", custom_input=True) as span:
+                        ai_reply = stream_reply(generate_reply_with_custom_input, ticket_to_ans, user_input, similar_resolution, summarized_thread, span=span)
+
+                with trace.span("type", chars=len(ai_reply)):
+                    click_reply_or_reply_all(driver)
+                    type_reply_in_iframe(driver, ai_reply)
+                trace.finish()
+                trace = None
+
+                exit_after_reply = input(f"Type '{RED}exit{RESET}' to return to the requests page or '{RED}quit{RESET}' to end the session: ").strip()
+
+                if prefetcher:
+                    prefetcher.mark_handled(ticket_to_ans)
+
+                if exit_after_reply.lower() == 'quit':
+                    print("Exiting the system.")
+                    quit_session()
+                    break
+                elif exit_after_reply.lower() == 'exit':
+                    driver.get(requests_url())
+
+        except Exception as e:
+            print(f"Error: Could not navigate to ticket {ticket_to_ans} or scrape the data. {e}")
+        finally:
+            # Tickets that failed or had no messages are still traced up to where they stopped
+            if trace is not None:
+                trace.finish()
+
+if __name__ == "__main__":
+    main()
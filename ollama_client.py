@@ -0,0 +1,171 @@
+import os
+import json
+import asyncio
+import threading
+import httpx
+
+OLLAMA_HOST = "http://localhost:11434"
+
+class AsyncOllamaClient:
+    """
+    Asyncio client for Ollama's /api/generate endpoint over a pooled keep-alive HTTP connection.
+
+    At most `max_concurrency` requests are in flight at once, each request has a timeout and is
+    retried with exponential backoff on connection errors, timeouts and 5xx responses (as long as
+    no tokens were streamed yet), and every request passes `keep_alive` so Ollama keeps the model
+    resident between tickets instead of reloading it.
+    """
+
+    def __init__(self, model="llama3.2", base_url=None, max_concurrency=2, timeout=120.0, retries=2, keep_alive="30m"):
+        """
+        Args:
+            model (str): Ollama model name.
+            base_url (str): Ollama server URL. Defaults to OLLAMA_HOST from the environment or localhost.
+            max_concurrency (int): Maximum number of concurrent generate requests.
+            timeout (float): Seconds to wait for the server to respond (per read, not for the whole reply).
+            retries (int): Retries after the first attempt fails.
+            keep_alive (str): How long Ollama keeps the model loaded after a request, e.g. '30m' or '-1' for forever.
+        """
+        self.model = model
+        self.base_url = (base_url or os.getenv("OLLAMA_HOST", OLLAMA_HOST)).rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.keep_alive = keep_alive
+        self._timeout = httpx.Timeout(timeout, connect=10.0)
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_client(self):
+        # Created lazily so the client and semaphore belong to the event loop that uses them
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self._timeout, limits=limits)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def __aenter__(self):
+        self._ensure_client()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def warm_up(self):
+        """
+        Ask Ollama to load the model now (an empty prompt only loads it) and keep it resident.
+        """
+        self._ensure_client()
+        response = await self._client.post("/api/generate", json={"model": self.model, "keep_alive": self.keep_alive})
+        response.raise_for_status()
+
+    async def generate(self, prompt, on_token=None, options=None):
+        """
+        Generate a completion, streaming tokens to `on_token` as they arrive.
+
+        Args:
+            prompt (str): Prompt to send to the model.
+            on_token (callable): Called with each text chunk as it arrives.
+            options (dict): Ollama model options such as temperature or num_predict.
+
+        Returns:
+            str: The full generated text.
+        """
+        self._ensure_client()
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        if options:
+            payload["options"] = options
+
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                chunks = []
+                try:
+                    async with self._client.stream("POST", "/api/generate", json=payload) as response:
+                        if response.is_error:
+                            await response.aread()
+                            response.raise_for_status()
+                        # Read to the end of the stream (Ollama ends it after the 'done' message): breaking out
+                        # early leaves httpx's nested byte iterators to be finalized by the event loop
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            message = json.loads(line)
+                            if message.get("error"):
+                                raise RuntimeError(f"Ollama error: {message['error']}")
+                            token = message.get("response", "")
+                            if token:
+                                chunks.append(token)
+                                if on_token:
+                                    on_token(token)
+                    return "".join(chunks)
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500
+                    # Tokens already handed to on_token cannot be taken back, so only retry clean failures
+                    if chunks or not retryable or attempt == self.retries:
+                        raise
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def generate_many(self, prompts, options=None):
+        """
+        Generate completions for many prompts concurrently, within the concurrency limit.
+
+        Args:
+            prompts (list[str]): Prompts to send to the model.
+            options (dict): Ollama model options applied to every prompt.
+
+        Returns:
+            list: Generated text per prompt, in order, or the exception raised for that prompt.
+        """
+        return await asyncio.gather(*(self.generate(prompt, options=options) for prompt in prompts), return_exceptions=True)
+
+class BackgroundOllama:
+    """
+    Runs an AsyncOllamaClient on its own event loop thread so synchronous code and thread pools can share it.
+    """
+
+    def __init__(self, **client_kwargs):
+        """
+        Args:
+            **client_kwargs: Passed to AsyncOllamaClient.
+        """
+        self.client = AsyncOllamaClient(**client_kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ollama-client", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt, on_token=None, options=None):
+        """
+        Schedule a generation on the client's loop.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the generated text.
+        """
+        return asyncio.run_coroutine_threadsafe(self.client.generate(prompt, on_token=on_token, options=options), self._loop)
+
+    def generate(self, prompt, on_token=None, options=None):
+        """
+        Generate a completion and block until it is finished.
+        """
+        return self.submit(prompt, on_token=on_token, options=options).result()
+
+    def generate_many(self, prompts, options=None):
+        """
+        Generate completions for many prompts concurrently and block until all are finished.
+        """
+        return asyncio.run_coroutine_threadsafe(self.client.generate_many(prompts, options=options), self._loop).result()
+
+    def warm_up(self):
+        """
+        Start loading the model in Ollama without waiting for it.
+
+        Returns:
+            concurrent.futures.Future: Resolves once the model is loaded.
+        """
+        return asyncio.run_coroutine_threadsafe(self.client.warm_up(), self._loop)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,245 @@
+import os
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from colors import RESET, YELLOW
+from tracing import TicketTrace
+
+# Set on worker threads while they run a prefetcher's stages
+_worker = threading.local()
+
+def preemptible(future):
+    """
+    Let the interactive session cancel an LLM request made by a prefetch stage.
+
+    LLM stages call this with the concurrent Future of their request (e.g. from BackgroundOllama.submit).
+    Outside prefetch workers it does nothing.
+
+    Args:
+        future (concurrent.futures.Future): The in-flight request.
+
+    Returns:
+        concurrent.futures.Future: The same future.
+    """
+    prefetcher = getattr(_worker, "prefetcher", None)
+    if prefetcher is not None:
+        prefetcher._track(future)
+    return future
+
+class TicketPrefetcher:
+    """
+    Draft replies for open tickets in the background before the operator picks them.
+
+    A single fetch thread walks the queued tickets with its own browser session (WebDriver is not
+    thread-safe) and hands each scraped thread to a worker pool that runs the pipeline stages.
+    Stages flagged as LLM stages also take a slot from a semaphore sized to what Ollama can serve
+    concurrently. While the interactive session is inside `interactive()`, workers finish their
+    current stage and then wait, and LLM requests registered with `preemptible()` are cancelled and
+    retried once it is done. The operator's own LLM call runs inside `interactive_llm()`, which holds
+    every LLM slot, so it is not queued behind a background generation; LLM stages that cannot be
+    cancelled only delay that call, not the operator's CPU stages.
+    """
+
+    def __init__(self, fetch_thread, stages, max_workers=None, llm_slots=1):
+        """
+        Args:
+            fetch_thread (callable): fetch_thread(ticket) -> dict with at least 'subject' and 'email_thread'.
+                Only ever called from the fetch thread.
+            stages (list[tuple]): (name, function, uses_llm) tuples run in order; each function takes the
+                draft dict and returns a dict of fields to add to it.
+            max_workers (int): Size of the worker pool. Defaults to half the CPU count.
+            llm_slots (int): Number of stages allowed to call the LLM at the same time.
+        """
+        self.fetch_thread = fetch_thread
+        self.stages = stages
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.drafts = {}
+        self._status = {}
+        self._lock = threading.Lock()
+        self._queue = []
+        self._queue_ready = threading.Condition(self._lock)
+        self._idle = threading.Event()
+        self._idle.set()
+        self._interactive_depth = 0
+        self._llm_depth = 0
+        self.llm_slots = llm_slots
+        self._llm_slots = threading.BoundedSemaphore(llm_slots)
+        self._in_flight = set()
+        self._stopped = False
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prefetch")
+        self._fetcher = threading.Thread(target=self._fetch_loop, name="prefetch-fetch", daemon=True)
+        self._fetcher.start()
+
+    def enqueue(self, tickets):
+        """
+        Queue tickets for prefetching, skipping any that are already queued, in progress, drafted or handled.
+
+        Args:
+            tickets (list[dict]): Ticket records as returned by scrape_tickets.
+        """
+        with self._queue_ready:
+            for ticket in tickets:
+                if ticket["number"] not in self._status:
+                    self._status[ticket["number"]] = "queued"
+                    self._queue.append(ticket)
+            self._queue_ready.notify()
+
+    def status(self, ticket_number):
+        """
+        Returns:
+            str: 'queued', 'fetching', 'drafting', 'ready', 'failed', 'handled' or None if the ticket was never queued.
+        """
+        with self._lock:
+            return self._status.get(ticket_number)
+
+    def get(self, ticket_number):
+        """
+        Return the finished draft for a ticket.
+
+        Returns:
+            dict: The draft fields, or None if the ticket is not drafted yet.
+        """
+        with self._lock:
+            return self.drafts.get(ticket_number) if self._status.get(ticket_number) == "ready" else None
+
+    def forget(self, ticket_number):
+        """
+        Drop a ticket's draft so it is prefetched again next time it is queued, e.g. after a new reply arrived.
+        """
+        with self._lock:
+            self.drafts.pop(ticket_number, None)
+            self._status.pop(ticket_number, None)
+
+    def mark_handled(self, ticket_number):
+        """
+        Drop the draft of a ticket the operator has answered and stop prefetching it for the rest of the session.
+        """
+        with self._lock:
+            self.drafts.pop(ticket_number, None)
+            self._status[ticket_number] = "handled"
+
+    @contextlib.contextmanager
+    def interactive(self):
+        """
+        Context manager that pauses background stages while the operator's ticket is being processed.
+
+        Background LLM requests registered with `preemptible()` are cancelled; stages already running
+        otherwise finish in the background without blocking the caller.
+        """
+        with self._lock:
+            self._interactive_depth += 1
+            self._idle.clear()
+            in_flight = list(self._in_flight)
+        for future in in_flight:
+            future.cancel()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._interactive_depth -= 1
+                if self._interactive_depth == 0:
+                    self._idle.set()
+
+    @contextlib.contextmanager
+    def interactive_llm(self):
+        """
+        Context manager for the operator's LLM call: pauses background stages like `interactive()` and
+        holds every LLM slot until the block exits, waiting for in-flight LLM stages that could not be
+        cancelled.
+        """
+        with self.interactive():
+            with self._lock:
+                self._llm_depth += 1
+                outermost = self._llm_depth == 1
+            acquired = 0
+            try:
+                # Nested blocks already run under the slots taken by the outermost one
+                for _ in range(self.llm_slots if outermost else 0):
+                    self._llm_slots.acquire()
+                    acquired += 1
+                yield
+            finally:
+                for _ in range(acquired):
+                    self._llm_slots.release()
+                with self._lock:
+                    self._llm_depth -= 1
+
+    def shutdown(self, wait=False):
+        """
+        Stop fetching new tickets and shut down the worker pool.
+        """
+        with self._queue_ready:
+            self._stopped = True
+            self._queue_ready.notify()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _track(self, future):
+        with self._lock:
+            self._in_flight.add(future)
+            # Cancel right away if the operator started while the request was being set up
+            if not self._idle.is_set():
+                future.cancel()
+        future.add_done_callback(self._untrack)
+
+    def _untrack(self, future):
+        with self._lock:
+            self._in_flight.discard(future)
+
+    def _set_status(self, ticket_number, status):
+        with self._lock:
+            if ticket_number in self._status:
+                self._status[ticket_number] = status
+
+    def _fetch_loop(self):
+        while True:
+            with self._queue_ready:
+                while not self._queue and not self._stopped:
+                    self._queue_ready.wait()
+                if self._stopped:
+                    return
+                ticket = self._queue.pop(0)
+            self._idle.wait()
+            self._set_status(ticket["number"], "fetching")
+            trace = TicketTrace(ticket["number"], mode="prefetch")
+            try:
+                with trace.span("scrape"):
+                    draft = dict(ticket, **self.fetch_thread(ticket))
+            except Exception as e:
+                print(f"{YELLOW}Prefetch could not fetch ticket {ticket['number']}: {e}{RESET}")
+                self._set_status(ticket["number"], "failed")
+                trace.finish()
+                continue
+            self._set_status(ticket["number"], "drafting")
+            try:
+                self._pool.submit(self._run_stages, draft, trace)
+            except RuntimeError:
+                return
+
+    def _run_stages(self, draft, trace):
+        _worker.prefetcher = self
+        try:
+            for name, stage, uses_llm in self.stages:
+                while True:
+                    self._idle.wait()
+                    if not uses_llm:
+                        with trace.span(name):
+                            draft.update(stage(draft))
+                        break
+                    try:
+                        with self._llm_slots, trace.span(name):
+                            draft.update(stage(draft))
+                        break
+                    except CancelledError:
+                        # Preempted by the interactive session; run the stage again once it is done
+                        continue
+        except Exception as e:
+            print(f"{YELLOW}Prefetch stage '{name}' failed for ticket {draft['number']}: {e}{RESET}")
+            self._set_status(draft["number"], "failed")
+            return
+        finally:
+            _worker.prefetcher = None
+            trace.finish()
+        with self._lock:
+            if draft["number"] in self._status:
+                self.drafts[draft["number"]] = draft
+                self._status[draft["number"]] = "ready"
@@ -0,0 +1,139 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+class ResponseCache:
+    """
+    Content-addressed, size-bounded SQLite cache for summaries, retrieved resolutions and LLM replies.
+
+    Entries are keyed by a SHA-256 of the kind of result, the input text, the model name and the
+    generation parameters, so any change to one of them is a cache miss. When the stored values
+    exceed `max_bytes` the least recently used entries are evicted; a single value larger than
+    `max_bytes` is not stored at all. The total size is kept in the database next to the entries,
+    updated in the same transaction, so every process sharing the file sees the same figure.
+    """
+
+    def __init__(self, path="response_cache.sqlite3", max_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            path (str): Path of the SQLite database file.
+            max_bytes (int): Upper bound on the total size of the cached values.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            # Databases written before the running total existed are summed once
+            self._conn.execute(
+                "INSERT OR IGNORE INTO totals (name, value) SELECT 'size', COALESCE(SUM(size), 0) FROM entries"
+            )
+
+    @staticmethod
+    def make_key(kind, text, model_name, params=None):
+        """
+        Build the content hash used as the cache key.
+
+        Args:
+            kind (str): Kind of cached result, e.g. 'summary', 'resolution' or 'reply'.
+            text (str): Input text the result was computed from.
+            model_name (str): Name of the model that produced the result.
+            params (dict): Generation parameters that affect the result.
+
+        Returns:
+            str: Hex digest identifying the entry.
+        """
+        payload = json.dumps([kind, model_name, params or {}, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, kind, text, model_name, params=None):
+        """
+        Look up a cached result and mark it as recently used.
+
+        Returns:
+            str: The cached value, or None on a miss.
+        """
+        key = self.make_key(kind, text, model_name, params)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def set(self, kind, text, model_name, params, value):
+        """
+        Store a result and evict least recently used entries if the cache is over its size bound.
+
+        Values larger than the bound are not stored, since they would evict every other entry and then themselves.
+        """
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        key = self.make_key(kind, text, model_name, params)
+        with self._lock, self._conn:
+            # Subtracting the size of the value being replaced is the first write, so it runs inside the
+            # transaction other processes are locked out of
+            self._conn.execute(
+                "UPDATE totals SET value = value - COALESCE((SELECT size FROM entries WHERE key = ?), 0) + ? "
+                "WHERE name = 'size'",
+                (key, size),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, kind, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, value, size, time.time()),
+            )
+            self._evict()
+
+    def get_or_compute(self, kind, text, model_name, params, compute):
+        """
+        Return the cached result for the inputs, computing and storing it on a miss.
+
+        Args:
+            compute (callable): Zero-argument function producing the value on a cache miss.
+
+        Returns:
+            str: The cached or freshly computed value.
+        """
+        value = self.get(kind, text, model_name, params)
+        if value is None:
+            value = compute()
+            if value:
+                self.set(kind, text, model_name, params, value)
+        return value
+
+    def total_bytes(self):
+        """
+        Returns:
+            int: Total size of the cached values.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0]
+
+    def _evict(self):
+        total = self._conn.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC")
+        stale_keys = []
+        freed = 0
+        for key, size in rows:
+            if total - freed <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale_keys)
+        self._conn.execute("UPDATE totals SET value = value - ? WHERE name = 'size'", (freed,))
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,221 @@
+import os
+import threading
+from lazy_imports import lazy_import
+from text_cleaner import MESSAGE_SEPARATOR
+
+BART_MODEL_NAME = "facebook/bart-large-cnn"
+
+_summarizer = None
+_summarizer_lock = threading.Lock()
+
+def load_bart_model(quantize=False):
+    """
+    Load the BART model and tokenizer for text summarization.
+
+    Args:
+        quantize (bool): Whether to dynamically quantize the model's linear layers to int8 for CPU inference.
+
+    Returns:
+        model: Loaded BART model for conditional generation, in eval mode.
+        tokenizer: Tokenizer associated with the BART model.
+    """
+    # torch and transformers take seconds to import, so they are only loaded with the model
+    torch = lazy_import("torch")
+    transformers = lazy_import("transformers")
+    model = transformers.BartForConditionalGeneration.from_pretrained(BART_MODEL_NAME)
+    tokenizer = transformers.BartTokenizer.from_pretrained(BART_MODEL_NAME)
+    model.eval()
+    if quantize:
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model, tokenizer
+
+def get_summarizer():
+    """
+    Return the process-wide BART model and tokenizer, loading them on first use.
+
+    Returns:
+        tuple: (model, tokenizer) shared by every caller.
+    """
+    global _summarizer
+    if _summarizer is None:
+        with _summarizer_lock:
+            if _summarizer is None:
+                # Set BART_QUANTIZE=1 to run the summarizer as a dynamically-quantized int8 model on CPU
+                quantize = os.getenv("BART_QUANTIZE", "0").lower() in ("1", "true", "yes")
+                _summarizer = load_bart_model(quantize=quantize)
+    return _summarizer
+
+def warm_up_summarizer(background=True):
+    """
+    Load the summarizer and run one short generation so the first real ticket only pays for inference.
+
+    Args:
+        background (bool): Run the warm-up in a daemon thread instead of blocking the caller.
+
+    Returns:
+        threading.Thread or None: The warm-up thread when running in the background.
+    """
+    def _warm_up():
+        try:
+            summarize_thread("Warm-up request for the helpdesk summarizer.", max_length=20)
+        except Exception as e:
+            print(f"Summarizer warm-up failed: {e}")
+
+    if not background:
+        _warm_up()
+        return None
+    thread = threading.Thread(target=_warm_up, name="summarizer-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def summarize_thread(thread_text, model=None, tokenizer=None, max_length=130):
+    """
+    Summarize a given thread text using the BART model.
+
+    Args:
+        thread_text (str): Text of the email thread to be summarized.
+        model: BART model for summarization. Defaults to the shared summarizer.
+        tokenizer: Tokenizer for the BART model. Defaults to the shared tokenizer.
+        max_length (int): Maximum length of the summary.
+
+    Returns:
+        str: Summarized text.
+    """
+    return summarize_threads([thread_text], batch_size=1, model=model, tokenizer=tokenizer, max_length=max_length)[0]
+
+def summarize_threads(thread_texts, batch_size=8, model=None, tokenizer=None, max_length=130, num_beams=4):
+    """
+    Summarize many thread texts with batched, padded generate calls.
+
+    Inputs are sorted by token length before batching so each batch pads to a similar length,
+    and the summaries are returned in the order the texts were given.
+
+    Args:
+        thread_texts (list[str]): Texts of the email threads to be summarized.
+        batch_size (int): Number of threads per generate call.
+        model: BART model for summarization. Defaults to the shared summarizer.
+        tokenizer: Tokenizer for the BART model. Defaults to the shared tokenizer.
+        max_length (int): Maximum length of each summary.
+        num_beams (int): Beam width; 1 uses greedy decoding.
+
+    Returns:
+        list[str]: Summarized texts, one per input thread.
+    """
+    if model is None or tokenizer is None:
+        model, tokenizer = get_summarizer()
+    if not thread_texts:
+        return []
+
+    encoded = tokenizer(list(thread_texts), max_length=1024, truncation=True)["input_ids"]
+    order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]))
+    summaries = [None] * len(encoded)
+
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start + batch_size]
+        inputs = tokenizer.pad({"input_ids": [encoded[i] for i in batch_idx]}, return_tensors="pt")
+        with lazy_import("torch").inference_mode():
+            summary_ids = model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_length=max_length,
+                min_length=min(30, max_length),
+                length_penalty=2.0,
+                num_beams=num_beams,
+                early_stopping=num_beams > 1,
+            )
+        for i, text in zip(batch_idx, tokenizer.batch_decode(summary_ids, skip_special_tokens=True)):
+            summaries[i] = text
+    return summaries
+
+def _pack_chunks(segments, lengths, chunk_tokens, overlap_segments):
+    """
+    Greedily pack consecutive segments into chunks of at most `chunk_tokens` tokens.
+
+    Each chunk after the first starts with the last `overlap_segments` segments of the previous one.
+    Packing runs from the start of the thread, so appending segments never changes earlier chunks.
+
+    Returns:
+        list[list[int]]: Segment indices of each chunk.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for idx, length in enumerate(lengths):
+        if current and current_tokens + length > chunk_tokens:
+            chunks.append(current)
+            current = current[-overlap_segments:] if overlap_segments else []
+            current_tokens = sum(lengths[i] for i in current)
+            if current_tokens + length > chunk_tokens:
+                current, current_tokens = [], 0
+        current.append(idx)
+        current_tokens += length
+    if current:
+        chunks.append(current)
+    return chunks
+
+def summarize_long_thread(thread_text, chunk_tokens=900, overlap_segments=1, batch_size=4, max_length=130, cache=None):
+    """
+    Summarize a thread of any length by summarizing token-budgeted chunks and then their summaries.
+
+    The thread is split into messages on MESSAGE_SEPARATOR (as written by clean_messages_for_ai),
+    whole messages are packed into overlapping chunks of at most `chunk_tokens` tokens, the chunks
+    are summarized as one batch, and the chunk summaries are reduced the same way until they fit in
+    one chunk. Only a message longer than the budget is split, on line boundaries and, for a single
+    oversized line, on token boundaries. Threads that already fit in one chunk get a plain
+    summarize_thread call.
+
+    Per-chunk summaries are stored in `cache` when given, so when a reply is appended to the thread
+    only the final chunk (and the reduce step) is summarized again.
+
+    Args:
+        thread_text (str): Cleaned text of the email thread.
+        chunk_tokens (int): Token budget of each chunk; must stay below the model's 1024-token limit.
+        overlap_segments (int): Number of trailing messages (or pieces of a split message) repeated
+            at the start of the next chunk.
+        batch_size (int): Number of chunks per generate call.
+        max_length (int): Maximum length of each chunk summary and of the final summary.
+        cache (ResponseCache): Optional cache for per-chunk summaries.
+
+    Returns:
+        str: Summarized text.
+    """
+    model, tokenizer = get_summarizer()
+    messages = [message.strip() for message in thread_text.split(MESSAGE_SEPARATOR) if message.strip()]
+    token_ids = tokenizer(messages, add_special_tokens=False)["input_ids"] if messages else []
+    if sum(len(ids) for ids in token_ids) <= chunk_tokens:
+        return summarize_thread(thread_text, model, tokenizer, max_length=max_length)
+
+    # Split oversized messages so every segment fits in a chunk on its own
+    pieces = []
+    for message, ids in zip(messages, token_ids):
+        if len(ids) <= chunk_tokens:
+            pieces.append((message, len(ids)))
+            continue
+        lines = [line for line in message.splitlines() if line.strip()]
+        line_ids = tokenizer(lines, add_special_tokens=False)["input_ids"]
+        line_chunks = _pack_chunks(lines, [len(ids) for ids in line_ids], chunk_tokens, 0)
+        for chunk in line_chunks:
+            if len(chunk) == 1 and len(line_ids[chunk[0]]) > chunk_tokens:
+                ids = line_ids[chunk[0]]
+                for start in range(0, len(ids), chunk_tokens):
+                    piece_ids = ids[start:start + chunk_tokens]
+                    pieces.append((tokenizer.decode(piece_ids), len(piece_ids)))
+            else:
+                pieces.append(("\n".join(lines[i] for i in chunk), sum(len(line_ids[i]) for i in chunk)))
+
+    chunks = _pack_chunks([text for text, _ in pieces], [length for _, length in pieces], chunk_tokens, overlap_segments)
+    chunk_texts = [MESSAGE_SEPARATOR.join(pieces[i][0] for i in chunk) for chunk in chunks]
+
+    params = {"max_length": max_length, "num_beams": 4, "chunk_tokens": chunk_tokens}
+    chunk_summaries = [cache.get("chunk_summary", text, BART_MODEL_NAME, params) if cache else None for text in chunk_texts]
+    missing = [i for i, summary in enumerate(chunk_summaries) if summary is None]
+    if missing:
+        fresh = summarize_threads([chunk_texts[i] for i in missing], batch_size=batch_size, model=model, tokenizer=tokenizer, max_length=max_length)
+        for i, summary in zip(missing, fresh):
+            chunk_summaries[i] = summary
+            if cache:
+                cache.set("chunk_summary", chunk_texts[i], BART_MODEL_NAME, params, summary)
+
+    return summarize_long_thread(
+        MESSAGE_SEPARATOR.join(chunk_summaries), chunk_tokens=chunk_tokens, overlap_segments=0,
+        batch_size=batch_size, max_length=max_length, cache=cache,
+    )
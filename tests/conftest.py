@@ -0,0 +1,10 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def no_trace_file(monkeypatch):
+    # Keep ticket traces from prefetch tests out of the working directory
+    monkeypatch.setenv("TRACE_FILE", "")
@@ -0,0 +1,142 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from ollama_client import BackgroundOllama
+
+class StubOllama(ThreadingHTTPServer):
+    """
+    Stand-in for an Ollama server that streams NDJSON replies from /api/generate.
+
+    The first `fail_first` requests get a 503. With `break_after_token`, replies stop after the first
+    token without finishing the chunked body, like a server that crashed mid-generation.
+    """
+
+    def __init__(self, tokens=("Restart ", "the ", "printer."), fail_first=0, break_after_token=False, delay=0.0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.tokens = tokens
+        self.fail_first = fail_first
+        self.break_after_token = break_after_token
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append(payload)
+            failing = len(server.requests) <= server.fail_first
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if failing:
+                body = b'{"error": "model is loading"}'
+                self.send_response(503)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in server.tokens if "prompt" in payload else ():
+                time.sleep(server.delay)
+                self.write_chunk(json.dumps({"response": token, "done": False}).encode() + b"\n")
+                if server.break_after_token:
+                    self.close_connection = True
+                    return
+            self.write_chunk(json.dumps({"response": "", "done": True}).encode() + b"\n")
+            self.write_chunk(b"")
+        finally:
+            with server.lock:
+                server.active -= 1
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server = StubOllama(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def clients():
+    opened = []
+
+    def open_client(server, **kwargs):
+        client = BackgroundOllama(model="llama3.2", base_url=server.url, **kwargs)
+        opened.append(client)
+        return client
+
+    yield open_client
+    for client in opened:
+        client.close()
+
+def test_streams_tokens_and_keeps_the_model_loaded(stub, clients):
+    server = stub()
+    tokens = []
+    reply = clients(server, keep_alive="45m").generate("Printer offline", on_token=tokens.append)
+    assert reply == "Restart the printer."
+    assert tokens == ["Restart ", "the ", "printer."]
+    assert server.requests == [{"model": "llama3.2", "prompt": "Printer offline", "stream": True, "keep_alive": "45m"}]
+
+def test_retries_a_503_with_backoff(stub, clients):
+    server = stub(fail_first=1)
+    start = time.perf_counter()
+    assert clients(server, retries=2).generate("Printer offline") == "Restart the printer."
+    assert len(server.requests) == 2
+    # The first retry waits half a second
+    assert time.perf_counter() - start >= 0.5
+
+def test_gives_up_after_the_last_retry(stub, clients):
+    server = stub(fail_first=5)
+    with pytest.raises(httpx.HTTPStatusError):
+        clients(server, retries=1).generate("Printer offline")
+    assert len(server.requests) == 2
+
+def test_does_not_retry_once_tokens_were_streamed(stub, clients):
+    server = stub(break_after_token=True)
+    tokens = []
+    with pytest.raises(httpx.TransportError):
+        clients(server, retries=2).generate("Printer offline", on_token=tokens.append)
+    assert tokens == ["Restart "]
+    assert len(server.requests) == 1
+
+def test_caps_concurrent_requests(stub, clients):
+    server = stub(delay=0.05)
+    replies = clients(server, max_concurrency=2).generate_many([f"Ticket {i}" for i in range(6)])
+    assert replies == ["Restart the printer."] * 6
+    assert server.max_active == 2
+
+def test_warm_up_only_loads_the_model(stub, clients):
+    server = stub()
+    clients(server, keep_alive="-1").warm_up().result(5)
+    assert server.requests == [{"model": "llama3.2", "keep_alive": "-1"}]
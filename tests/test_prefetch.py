@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import Future
+from prefetch import TicketPrefetcher, preemptible
+
+def test_interactive_session_preempts_background_generation():
+    started = threading.Event()
+    attempts = []
+
+    def draft_stage(draft):
+        # Stands in for an LLM request that only finishes when cancelled or after a retry
+        future = preemptible(Future())
+        attempts.append(future)
+        if len(attempts) == 1:
+            started.set()
+        else:
+            future.set_result("drafted")
+        return {"ai_reply": future.result()}
+
+    prefetcher = TicketPrefetcher(
+        lambda ticket: {"subject": ticket["subject"], "email_thread": "thread"},
+        [("draft", draft_stage, True)],
+        max_workers=1,
+        llm_slots=1,
+    )
+    try:
+        prefetcher.enqueue([{"number": "1001", "subject": "Printer"}])
+        assert started.wait(5)
+        with prefetcher.interactive():
+            # The background request was cancelled
+            assert attempts[0].cancelled()
+            with prefetcher.interactive_llm():
+                # The operator's LLM call holds the only LLM slot
+                assert not prefetcher._llm_slots.acquire(blocking=False)
+        for _ in range(500):
+            if prefetcher.status("1001") == "ready":
+                break
+            threading.Event().wait(0.01)
+        assert prefetcher.get("1001")["ai_reply"] == "drafted"
+        assert len(attempts) == 2
+    finally:
+        prefetcher.shutdown()
+
+def test_operator_cpu_stages_do_not_wait_for_a_background_generation():
+    started = threading.Event()
+    finish = threading.Event()
+
+    def draft_stage(draft):
+        # An LLM request that cannot be cancelled, like the default LangChain client's
+        started.set()
+        finish.wait(5)
+        return {"ai_reply": "drafted"}
+
+    prefetcher = TicketPrefetcher(
+        lambda ticket: {"subject": ticket["subject"], "email_thread": "thread"},
+        [("draft", draft_stage, True)],
+        max_workers=1,
+        llm_slots=1,
+    )
+    try:
+        prefetcher.enqueue([{"number": "1003", "subject": "Monitor"}])
+        assert started.wait(5)
+        entered = threading.Event()
+
+        def operator():
+            with prefetcher.interactive():
+                entered.set()
+                with prefetcher.interactive_llm():
+                    pass
+
+        thread = threading.Thread(target=operator)
+        thread.start()
+        # The operator's block starts at once; only its LLM call waits for the slot
+        assert entered.wait(1)
+        assert thread.is_alive()
+        finish.set()
+        thread.join(5)
+        assert not thread.is_alive()
+    finally:
+        finish.set()
+        prefetcher.shutdown()
+
+def test_handled_tickets_are_not_drafted_again():
+    fetched = []
+    prefetcher = TicketPrefetcher(lambda ticket: fetched.append(ticket["number"]) or {"email_thread": ""}, [], max_workers=1)
+    try:
+        prefetcher.mark_handled("1002")
+        prefetcher.enqueue([{"number": "1002", "subject": "VPN"}])
+        assert prefetcher.status("1002") == "handled"
+        assert fetched == []
+    finally:
+        prefetcher.shutdown()
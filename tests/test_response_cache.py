@@ -0,0 +1,29 @@
+from response_cache import ResponseCache
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    cache.set("reply", "a", "llama3.2", {}, "x" * 10)
+    cache.set("reply", "b", "llama3.2", {}, "y" * 10)
+    assert cache.get("reply", "a", "llama3.2") == "x" * 10
+    cache.set("reply", "c", "llama3.2", {}, "z" * 10)
+    # 'b' was used least recently
+    assert cache.get("reply", "b", "llama3.2") is None
+    assert cache.get("reply", "a", "llama3.2") == "x" * 10
+    assert cache.total_bytes() == 20
+
+def test_values_larger_than_the_bound_are_not_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    cache.set("reply", "a", "llama3.2", {}, "x" * 10)
+    cache.set("reply", "b", "llama3.2", {}, "y" * 100)
+    assert cache.get("reply", "b", "llama3.2") is None
+    assert cache.get("reply", "a", "llama3.2") == "x" * 10
+    assert cache.total_bytes() == 10
+
+def test_running_total_follows_replacements_and_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path, max_bytes=1000)
+    cache.set("summary", "thread", "bart", {}, "short")
+    cache.set("summary", "thread", "bart", {}, "a longer summary")
+    assert cache.total_bytes() == len("a longer summary")
+    cache.close()
+    assert ResponseCache(path, max_bytes=1000).total_bytes() == len("a longer summary")
@@ -0,0 +1,53 @@
+import summarizer
+from text_cleaner import MESSAGE_SEPARATOR
+
+class WordTokenizer:
+    """
+    Stand-in for the BART tokenizer: one token per whitespace-separated word.
+    """
+
+    def __call__(self, texts, add_special_tokens=True, **kwargs):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+def summarize_chunks(monkeypatch, thread_text, **kwargs):
+    """
+    Run summarize_long_thread with fake models and return the texts of the first round of chunks.
+    """
+    rounds = []
+    monkeypatch.setattr(summarizer, "get_summarizer", lambda: (None, WordTokenizer()))
+    monkeypatch.setattr(summarizer, "summarize_thread", lambda text, *args, **kwargs: "final")
+
+    def summarize_threads(texts, **kwargs):
+        rounds.append(list(texts))
+        return [f"summary {i}" for i in range(len(texts))]
+
+    monkeypatch.setattr(summarizer, "summarize_threads", summarize_threads)
+    assert summarizer.summarize_long_thread(thread_text, **kwargs) == "final"
+    return rounds[0]
+
+def message(index, lines, words=5):
+    return "\n".join(" ".join(f"m{index}l{line}w{word}" for word in range(words)) for line in range(lines))
+
+def test_chunks_hold_whole_messages(monkeypatch):
+    messages = [message(i, lines=4) for i in range(10)]
+    chunks = summarize_chunks(monkeypatch, MESSAGE_SEPARATOR.join(messages), chunk_tokens=50)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert all(part in messages for part in chunk.split(MESSAGE_SEPARATOR))
+    # Each chunk after the first starts with the last whole message of the previous one
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split(MESSAGE_SEPARATOR)[0] == previous.split(MESSAGE_SEPARATOR)[-1]
+    assert {part for chunk in chunks for part in chunk.split(MESSAGE_SEPARATOR)} == set(messages)
+
+def test_only_oversized_messages_are_split(monkeypatch):
+    messages = [message(0, lines=2), message(1, lines=30), message(2, lines=2)]
+    chunks = summarize_chunks(monkeypatch, MESSAGE_SEPARATOR.join(messages), chunk_tokens=50, overlap_segments=0)
+    parts = [part for chunk in chunks for part in chunk.split(MESSAGE_SEPARATOR)]
+    assert messages[0] in parts and messages[2] in parts
+    # The long message is split on line boundaries into pieces within the budget
+    pieces = [part for part in parts if part.startswith("m1")]
+    assert len(pieces) > 1 and "\n".join(pieces) == messages[1]
+    assert all(len(piece.split()) <= 50 for piece in pieces)
@@ -0,0 +1,27 @@
+from text_cleaner import MESSAGE_SEPARATOR, TextCleaner
+
+def test_lines_are_cleaned_and_deduplicated():
+    cleaner = TextCleaner(["Kind regards,", "Sent from my phone"])
+    text = "Hello,Hello,\n  The  VPN\tdrops  \n\nthe vpn drops\nKind regards,\nThank you,Thank you,\n  \nSent from my phone"
+    assert cleaner.clean(text) == "Regards,\nThe VPN drops\nThank you,"
+
+def test_lines_ending_in_whitespace_are_not_merged():
+    cleaner = TextCleaner([])
+    assert cleaner.clean("Printer offline  \n  Restarted it") == "Printer offline\nRestarted it"
+
+def test_phrases_exposed_by_a_removal_are_removed():
+    # The original replace-per-phrase cleaner left 'Best regards,' behind when it came first in the list
+    cleaner = TextCleaner(["Best regards,", "Kind regards,"])
+    assert cleaner.clean("Best Kind regards,regards,\nThe printer works") == "The printer works"
+
+def test_cleaner_keeps_message_boundaries():
+    cleaner = TextCleaner(["Sent from my phone"])
+    cleaned = cleaner.clean_messages([
+        "Printer on floor 2 is offline.\nSent from my phone",
+        "Did you restart it?\n\n\nPrinter on floor 2 is offline.",
+        "Sent from my phone",
+        "Yes,   twice.",
+    ])
+    # Quoted lines are dropped from later messages and emptied messages are omitted
+    assert cleaned.split(MESSAGE_SEPARATOR) == ["Printer on floor 2 is offline.", "Did you restart it?", "Yes, twice."]
+    assert cleaner.clean("Printer on floor 2 is offline.\n\nSent from my phone") == "Printer on floor 2 is offline."
@@ -0,0 +1,233 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from tfidf_similarity import TicketIndex, _resolution_vectorizer, compare_ai_response_to_resolution
+
+WORDS = ["printer", "vpn", "password", "reset", "laptop", "monitor", "account", "access", "email", "outlook",
+         "teams", "wifi", "network", "drive", "shared", "folder", "license", "install", "update", "error"]
+
+def make_rows(count, seed):
+    rng = np.random.default_rng(seed)
+    subjects = [" ".join(rng.choice(WORDS, size=4)) + f" case{seed}x{i}" for i in range(count)]
+    resolutions = [" ".join(rng.choice(WORDS, size=12)) + f" fixed{seed}x{i}" for i in range(count)]
+    return subjects, resolutions
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "resolved_tickets.csv"
+    subjects, resolutions = make_rows(60, seed=0)
+    pd.DataFrame({"Subject": subjects, "Resolution": resolutions}).to_csv(path, index=False)
+    return str(path)
+
+def assert_consistent(csv_path):
+    """
+    Reopen the index from disk and check every row's text and TF-IDF vectors against the CSV.
+    """
+    df = pd.read_csv(csv_path)
+    index = TicketIndex.open(csv_path)
+    assert len(index) == len(df)
+    assert len(index.subjects) == len(df) and len(index.resolutions) == len(df)
+    for name, column in (("subject", "Subject"), ("resolution", "Resolution")):
+        field = index.fields[name]
+        assert field.matrix.shape[0] == len(df)
+        expected = field.vectorizer.transform(df[column])
+        assert abs(field.matrix - expected).max() < 1e-5
+    assert [index.subjects[i] for i in range(len(df))] == list(df["Subject"])
+    assert [index.resolutions[i] for i in range(len(df))] == list(df["Resolution"])
+    return index
+
+def test_build_and_reopen(csv_path):
+    index = TicketIndex(csv_path)
+    assert index.refresh() == "rebuilt"
+    assert len(index) == 60
+    subject, resolution = index.find_similar_ticket("case0x7")
+    assert subject.endswith("case0x7") and resolution.endswith("fixed0x7")
+
+    reopened = TicketIndex(csv_path)
+    assert reopened.refresh() == "unchanged"
+    assert reopened.find_similar_ticket("case0x7") == (subject, resolution)
+    assert_consistent(csv_path)
+
+def test_append(csv_path):
+    index = TicketIndex.open(csv_path)
+    subjects, resolutions = make_rows(5, seed=1)
+    index.add_resolved_tickets(subjects, resolutions)
+    assert len(index) == 65
+    # Appended rows use the fitted vocabulary, so look them up by row rather than by their new tokens
+    assert (index.subjects[63], index.resolutions[63]) == (subjects[3], resolutions[3])
+    assert TicketIndex(csv_path).refresh() == "unchanged"
+    assert_consistent(csv_path)
+
+def test_touched_csv_is_not_rebuilt(csv_path):
+    index = TicketIndex.open(csv_path)
+    other = TicketIndex.open(csv_path)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert index.refresh() == "unchanged"
+    assert index.manifest["csv_mtime_ns"] == stat.st_mtime_ns + 10**9
+    assert other.refresh() == "unchanged"
+    assert_consistent(csv_path)
+
+def test_second_instance_picks_up_rows_indexed_by_another(csv_path):
+    first = TicketIndex.open(csv_path)
+    second = TicketIndex.open(csv_path)
+    subjects, resolutions = make_rows(5, seed=1)
+    first.add_resolved_tickets(subjects, resolutions)
+
+    assert second.refresh() == "appended"
+    assert len(second) == 65
+    assert (second.subjects[64], second.resolutions[64]) == (subjects[4], resolutions[4])
+    assert_consistent(csv_path)
+
+    # The stale instance appending on its own must not re-index the first instance's rows
+    more_subjects, more_resolutions = make_rows(3, seed=2)
+    third = TicketIndex.open(csv_path)
+    first.add_resolved_tickets(more_subjects[:1], more_resolutions[:1])
+    third.add_resolved_tickets(more_subjects[1:], more_resolutions[1:])
+    assert len(third) == 68
+    assert_consistent(csv_path)
+
+def test_rebuild_when_rows_change(csv_path):
+    index = TicketIndex.open(csv_path)
+    other = TicketIndex.open(csv_path)
+    subjects, resolutions = make_rows(40, seed=3)
+    pd.DataFrame({"Subject": subjects, "Resolution": resolutions}).to_csv(csv_path, index=False)
+
+    assert index.refresh() == "rebuilt"
+    assert len(index) == 40
+    assert index.find_similar_ticket("case3x9") == (subjects[9], resolutions[9])
+    # Another instance picks up the rebuild instead of redoing it
+    assert other.refresh() == "rebuilt"
+    assert other.find_similar_ticket("case3x9") == (subjects[9], resolutions[9])
+    assert_consistent(csv_path)
+
+def test_rebuild_after_too_many_appended_rows(csv_path):
+    index = TicketIndex.open(csv_path)
+    build = index.manifest["build_sha256"]
+    subjects, resolutions = make_rows(40, seed=4)
+    index.add_resolved_tickets(subjects, resolutions)
+    assert index.manifest["build_sha256"] != build
+    assert index.manifest["n_fitted"] == 100
+    assert_consistent(csv_path)
+
+class HashingModel:
+    """
+    Stand-in for the sentence-embedding model: deterministic unit vectors derived from the text.
+    """
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, convert_to_numpy=True):
+        vectors = np.array([np.random.default_rng(abs(hash(text)) % 2**32).normal(size=8) for text in texts])
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def open_embeddings(csv_path):
+    from embedding_similarity import EmbeddingIndex
+    index = EmbeddingIndex(TicketIndex(csv_path))
+    index._model = HashingModel()
+    index.refresh()
+    return index
+
+def test_embeddings_follow_rows_indexed_by_another_instance(csv_path):
+    first = open_embeddings(csv_path)
+    second = open_embeddings(csv_path)
+    subjects, resolutions = make_rows(5, seed=1)
+    first.ticket_index.add_resolved_tickets(subjects, resolutions)
+    assert first.refresh() == "appended"
+    assert second.refresh() == "appended"
+
+    more_subjects, more_resolutions = make_rows(3, seed=2)
+    second.ticket_index.add_resolved_tickets(more_subjects, more_resolutions)
+    second.refresh()
+    first.refresh()
+
+    df = pd.read_csv(csv_path)
+    reopened = open_embeddings(csv_path)
+    assert reopened.manifest["n_rows"] == len(df) == 68
+    expected = HashingModel().encode(list(df["Subject"])).astype(np.float16)
+    assert np.allclose(np.asarray(reopened.embeddings, dtype=np.float32), expected, atol=1e-3)
+
+def test_embedding_searches_run_safely_alongside_appends(csv_path):
+    index = open_embeddings(csv_path)
+    query = index.ticket_index.subjects[7]
+    errors = []
+    stop = threading.Event()
+
+    def search_loop():
+        while not stop.is_set():
+            try:
+                assert index.search(query, k=1)[0]["subject"] == query
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=search_loop) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        writer = TicketIndex(csv_path, refit_ratio=10.0)
+        for seed in range(10, 20):
+            writer.add_resolved_tickets(*make_rows(20, seed=seed))
+            assert index.refresh() == "appended"
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert not errors
+    assert index.manifest["n_rows"] == 260
+
+def test_searches_run_safely_alongside_reposts_and_rebuilds(tmp_path):
+    csv_path = str(tmp_path / "resolved_tickets.csv")
+    subjects, resolutions = make_rows(3000, seed=5)
+    pd.DataFrame({"Subject": subjects, "Resolution": resolutions}).to_csv(csv_path, index=False)
+    index = TicketIndex(csv_path, refit_ratio=10.0)
+    index.refresh()
+    appended_subjects, appended_resolutions = make_rows(1500, seed=6)
+    TicketIndex(csv_path, refit_ratio=10.0).add_resolved_tickets(appended_subjects, appended_resolutions)
+
+    # Searching never writes: the stale inverted index is only rebuilt by refresh
+    posted = {name: entry["n_posted"] for name, entry in index.manifest["fields"].items()}
+    index.search("printer vpn reset", field="both")
+    assert {name: entry["n_posted"] for name, entry in index.manifest["fields"].items()} == posted
+
+    errors = []
+    stop = threading.Event()
+
+    def search_loop():
+        while not stop.is_set():
+            try:
+                for candidate in index.search("printer vpn password reset", k=3, field="both"):
+                    assert candidate["subject"] and candidate["resolution"]
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=search_loop) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    try:
+        assert index.refresh() == "appended"
+        assert all(entry["n_posted"] == 4500 for entry in index.manifest["fields"].values())
+        rebuilt_subjects, rebuilt_resolutions = make_rows(2000, seed=7)
+        pd.DataFrame({"Subject": rebuilt_subjects, "Resolution": rebuilt_resolutions}).to_csv(csv_path, index=False)
+        assert index.refresh() == "rebuilt"
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert not errors
+    assert_consistent(csv_path)
+
+def test_compare_uses_the_prefitted_resolution_vocabulary(csv_path):
+    index = TicketIndex.open(csv_path)
+    resolution = index.resolutions[0]
+    assert compare_ai_response_to_resolution(resolution, resolution, index) == pytest.approx(100.0, abs=1e-3)
+    assert compare_ai_response_to_resolution(resolution, resolution, index.fields["resolution"].vectorizer) == pytest.approx(100.0, abs=1e-3)
+    df = pd.read_csv(csv_path)
+    assert compare_ai_response_to_resolution(resolution, resolution, df) == pytest.approx(100.0, abs=1e-3)
+    # The frame is vectorized once and the fit reused on later calls
+    vectorizer = _resolution_vectorizer(df)
+    assert _resolution_vectorizer(df) is vectorizer
+    assert compare_ai_response_to_resolution(index.resolutions[1], resolution, df) < 100.0
+    with pytest.raises(TypeError):
+        compare_ai_response_to_resolution(resolution, resolution, df["Resolution"])
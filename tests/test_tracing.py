@@ -0,0 +1,16 @@
+import pytest
+from tracing import TicketTrace, current_rss_mb
+
+@pytest.mark.skipif(current_rss_mb() is None, reason="resident memory is only sampled on Linux")
+def test_spans_report_the_memory_each_stage_held():
+    trace = TicketTrace("1001", path="")
+    with trace.span("allocate"):
+        buffer = bytearray(64 * 1024 * 1024)
+        # Touch every page so it is resident
+        buffer[::4096] = b"x" * len(buffer[::4096])
+    with trace.span("free"):
+        del buffer
+    allocate, free = trace.to_dict()["spans"]
+    assert allocate["rss_delta_mb"] > 50
+    assert free["rss_delta_mb"] < -50
+    assert free["rss_mb"] < allocate["rss_mb"]
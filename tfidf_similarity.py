@@ -1,7 +1,24 @@
+import os
+import io
+import json
+import pickle
+import weakref
+import hashlib
+import threading
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from file_lock import file_lock
+
+# Bump whenever the on-disk layout of TicketIndex changes so stale indexes get rebuilt
+INDEX_VERSION = 2
+
+# Resolution vectorizers fitted for DataFrames passed to the compare functions, keyed by id(df)
+# and dropped when the frame is garbage collected
+_frame_vectorizers = {}
+_frame_vectorizers_lock = threading.Lock()
 
 def load_ticket_data(resolved_tickets):
     """
@@ -75,21 +92,643 @@ def find_similar_ticket(new_subject, tfidf_matrix, df, vectorizer):
     
     return most_similar_ticket['Subject'], most_similar_ticket['Resolution']
 
+def _resolution_vectorizer(source):
+    """
+    Resolve the prefitted resolution vectorizer used to score replies.
+
+    A DataFrame is fitted once, on its first use, and the vectorizer is reused for as long as the
+    frame is alive; a frame modified in place afterwards keeps scoring with the original fit.
+
+    Args:
+        source: A TicketIndex, a fitted TfidfVectorizer, or a DataFrame with a 'Resolution' column.
+
+    Returns:
+        TfidfVectorizer: A fitted vectorizer.
+
+    Raises:
+        TypeError: For any other type.
+    """
+    if isinstance(source, TicketIndex):
+        return source.fields["resolution"].vectorizer
+    if isinstance(source, TfidfVectorizer):
+        return source
+    if isinstance(source, pd.DataFrame):
+        key = id(source)
+        with _frame_vectorizers_lock:
+            vectorizer = _frame_vectorizers.get(key)
+        if vectorizer is None:
+            vectorizer = vectorize_resolutions(source.fillna({"Resolution": ""}))[1]
+            with _frame_vectorizers_lock:
+                if key not in _frame_vectorizers:
+                    _frame_vectorizers[key] = vectorizer
+                    weakref.finalize(source, _frame_vectorizers.pop, key, None)
+                vectorizer = _frame_vectorizers[key]
+        return vectorizer
+    raise TypeError(f"Cannot get a resolution vectorizer from {type(source).__name__}.")
+
 def compare_ai_response_to_resolution(ai_response, resolution, df):
     """
     Compare an AI-generated response to an existing ticket resolution using cosine similarity.
 
+    Both texts are scored with the vocabulary and IDF of the resolved tickets, so the comparison is a
+    single sparse dot product. A DataFrame of ticket data is vectorized on its first use and the fit
+    is reused for later calls with the same frame; the TicketIndex avoids even that first fit. None
+    keeps the old behaviour of fitting a vectorizer on just the two texts.
+
     Args:
         ai_response (str): The AI-generated response to compare.
         resolution (str): The actual resolution to compare against.
-        df (pd.DataFrame): DataFrame containing ticket data.
+        df: Ticket data as a DataFrame with a 'Resolution' column, a TicketIndex, a fitted
+            TfidfVectorizer, or None.
 
     Returns:
         float: The similarity score as a percentage between the AI response and the actual resolution.
     """
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform([resolution, ai_response])
-    cosine_similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2]).flatten()
-    similarity_score = cosine_similarities[0] * 100
-    
-    return similarity_score
+    if df is None:
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform([resolution, ai_response])
+        cosine_similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2]).flatten()
+        return cosine_similarities[0] * 100
+    return float(compare_ai_responses_to_resolutions([ai_response], [resolution], df)[0, 0])
+
+def compare_ai_responses_to_resolutions(ai_responses, resolutions, df):
+    """
+    Score many candidate replies against many resolutions at once.
+
+    Args:
+        ai_responses (list[str]): AI-generated candidate replies.
+        resolutions (list[str]): Resolutions to compare against.
+        df: Ticket data as a DataFrame with a 'Resolution' column, a TicketIndex, or a fitted
+            TfidfVectorizer, providing the vocabulary and IDF.
+
+    Returns:
+        np.ndarray: Similarity percentages with one row per reply and one column per resolution.
+    """
+    vectorizer = _resolution_vectorizer(df)
+    # TfidfVectorizer rows are L2-normalised, so the sparse product is the cosine similarity
+    response_tfidf = vectorizer.transform(ai_responses)
+    resolution_tfidf = vectorizer.transform(resolutions)
+    return (response_tfidf @ resolution_tfidf.T).toarray() * 100
+
+def _file_digest(path, size):
+    """
+    Hash the first `size` bytes of a file.
+
+    Args:
+        path (str): Path of the file to hash.
+        size (int): Number of leading bytes to include in the hash.
+
+    Returns:
+        hashlib._Hash: A SHA-256 hasher that can be copied and updated with further bytes.
+    """
+    hasher = hashlib.sha256()
+    remaining = size
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(1 << 20, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+def _replace_file(path, data):
+    """
+    Replace a file's contents by writing a temporary file and renaming it over the original.
+
+    Readers that memory-mapped the old file keep a valid mapping of the old contents; rewriting it in
+    place would truncate the file under their mapping.
+
+    Args:
+        path (str): File to replace.
+        data: Bytes, or a NumPy array written in its native layout.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        if isinstance(data, np.ndarray):
+            data.tofile(f)
+        else:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+def _write_at(path, offset, data):
+    """
+    Write bytes at an offset of an append-only file, first dropping anything past the offset.
+
+    Anything past the offset was left by an append that never reached the manifest (e.g. an
+    interrupted process), so writing at the offset the manifest records keeps the files in line
+    with each other. Readers only map the prefix the manifest records, so truncating past it is safe.
+    """
+    with open(path, "r+b") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(data)
+
+def _map_array(path, dtype, count):
+    """
+    Memory-map a flat binary array, falling back to an empty array when there is nothing to map.
+    """
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+class _TextStore:
+    """
+    Append-only, memory-mapped store of UTF-8 strings (one blob file plus an offsets file).
+    """
+
+    def __init__(self, base_path):
+        self.blob_path = f"{base_path}.bin"
+        self.offsets_path = f"{base_path}.idx"
+        self._blob = None
+        self._offsets = None
+
+    def write(self, texts):
+        """
+        Replace the store's files with the given texts; call load() afterwards to map them.
+        """
+        encoded = [str(text).encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        _replace_file(self.blob_path, b"".join(encoded))
+        _replace_file(self.offsets_path, offsets)
+
+    def load(self, count):
+        self._offsets = _map_array(self.offsets_path, np.int64, count + 1)
+        self._blob = _map_array(self.blob_path, np.uint8, int(self._offsets[-1]))
+
+    def append(self, texts):
+        start = end = int(self._offsets[-1])
+        chunks, offsets = [], []
+        for text in texts:
+            encoded = str(text).encode("utf-8")
+            chunks.append(encoded)
+            end += len(encoded)
+            offsets.append(end)
+        _write_at(self.blob_path, start, b"".join(chunks))
+        _write_at(self.offsets_path, len(self._offsets) * 8, np.asarray(offsets, dtype=np.int64).tobytes())
+
+    def __getitem__(self, idx):
+        start, end = int(self._offsets[idx]), int(self._offsets[idx + 1])
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def __len__(self):
+        return 0 if self._offsets is None else len(self._offsets) - 1
+
+class _SparseField:
+    """
+    On-disk TF-IDF matrix of one text column, plus an impact-ordered inverted index for top-k search.
+
+    The CSR arrays are append-only. The inverted index (postings per term, sorted by weight, highest
+    first) covers the first `n_posted` rows; rows appended after it was built are scored exactly.
+    """
+
+    def __init__(self, name, index_dir):
+        self.name = name
+        self.index_dir = index_dir
+        self.vectorizer = None
+        self.vectorizer_build = None
+        self.matrix = None
+        self.postings = None
+
+    def _path(self, suffix):
+        return os.path.join(self.index_dir, f"{self.name}_{suffix}")
+
+    def write(self, tfidf_matrix, vectorizer):
+        """
+        Write a freshly fitted matrix and vectorizer, replacing any previous files.
+
+        The loaded matrix and vectorizer are left alone, so searches keep running on them until load().
+
+        Returns:
+            dict: The manifest entry for the field.
+        """
+        _replace_file(self._path("vectorizer.pkl"), pickle.dumps(vectorizer, protocol=pickle.HIGHEST_PROTOCOL))
+        tfidf_matrix = tfidf_matrix.tocsr()
+        _replace_file(self._path("data.bin"), tfidf_matrix.data.astype(np.float32))
+        _replace_file(self._path("indices.bin"), tfidf_matrix.indices.astype(np.int32))
+        _replace_file(self._path("indptr.bin"), tfidf_matrix.indptr.astype(np.int32))
+        entry = {"nnz": int(tfidf_matrix.nnz), "n_features": len(vectorizer.vocabulary_), "n_posted": 0}
+        return self.write_postings(tfidf_matrix, entry)
+
+    def write_postings(self, tfidf_matrix, entry):
+        """
+        Build the inverted index for every row of the matrix and write it to disk.
+
+        Returns:
+            dict: The updated manifest entry for the field.
+        """
+        coo = tfidf_matrix.tocoo()
+        # Group by term, then by descending weight, so truncating a posting list keeps its strongest rows
+        order = np.lexsort((-coo.data, coo.col))
+        _replace_file(self._path("post_rows.bin"), np.ascontiguousarray(coo.row[order], dtype=np.int32))
+        _replace_file(self._path("post_data.bin"), np.ascontiguousarray(coo.data[order], dtype=np.float32))
+        counts = np.bincount(coo.col, minlength=entry["n_features"])
+        _replace_file(self._path("post_ptr.bin"), np.concatenate(([0], np.cumsum(counts))).astype(np.int64))
+        entry["n_posted"] = tfidf_matrix.shape[0]
+        entry["n_posted_nnz"] = int(coo.nnz)
+        return entry
+
+    def append(self, texts, n_rows, entry):
+        """
+        Transform new rows with the existing vocabulary and append them to the CSR files.
+
+        Args:
+            texts (list[str]): Texts of the new rows.
+            n_rows (int): Number of rows already stored, as recorded in the manifest.
+            entry (dict): The field's manifest entry, updated in place.
+        """
+        new_tfidf = self.vectorizer.transform(texts).tocsr()
+        nnz = entry["nnz"]
+        _write_at(self._path("data.bin"), nnz * 4, new_tfidf.data.astype(np.float32).tobytes())
+        _write_at(self._path("indices.bin"), nnz * 4, new_tfidf.indices.astype(np.int32).tobytes())
+        _write_at(self._path("indptr.bin"), (n_rows + 1) * 4, (new_tfidf.indptr[1:] + nnz).astype(np.int32).tobytes())
+        entry["nnz"] = nnz + int(new_tfidf.nnz)
+
+    def load(self, n_rows, entry, build):
+        # The vectorizer only changes with a rebuild, which another instance may have done
+        if self.vectorizer is None or self.vectorizer_build != build:
+            with open(self._path("vectorizer.pkl"), "rb") as f:
+                self.vectorizer = pickle.load(f)
+            self.vectorizer_build = build
+        nnz = entry["nnz"]
+        data = _map_array(self._path("data.bin"), np.float32, nnz)
+        indices = _map_array(self._path("indices.bin"), np.int32, nnz)
+        indptr = _map_array(self._path("indptr.bin"), np.int32, n_rows + 1)
+        self.matrix = sp.csr_matrix((data, indices, indptr), shape=(n_rows, entry["n_features"]), copy=False)
+        posted_nnz = entry.get("n_posted_nnz", 0)
+        self.postings = (
+            _map_array(self._path("post_ptr.bin"), np.int64, entry["n_features"] + 1),
+            _map_array(self._path("post_rows.bin"), np.int32, posted_nnz),
+            _map_array(self._path("post_data.bin"), np.float32, posted_nnz),
+        )
+        self.n_posted = entry["n_posted"]
+
+    def candidates(self, query_text, max_postings=None):
+        """
+        Score the rows sharing at least one term with the query.
+
+        Args:
+            query_text (str): Text to search for.
+            max_postings (int): Read at most this many of the highest-weighted postings per query term.
+                None scores every posting, which is exact.
+
+        Returns:
+            tuple: (rows, scores) arrays; rows may contain duplicates whose scores must be summed.
+        """
+        query = self.vectorizer.transform([query_text]).tocsr()
+        post_ptr, post_rows, post_data = self.postings
+        rows, scores = [], []
+        for term, weight in zip(query.indices, query.data):
+            start, end = int(post_ptr[term]), int(post_ptr[term + 1])
+            if max_postings is not None:
+                end = min(end, start + max_postings)
+            rows.append(post_rows[start:end])
+            scores.append(post_data[start:end] * weight)
+        if self.matrix.shape[0] > self.n_posted:
+            # Rows appended since the inverted index was built are scored exactly
+            tail_scores = (self.matrix[self.n_posted:] @ query.T).toarray().ravel()
+            hits = np.flatnonzero(tail_scores)
+            rows.append((hits + self.n_posted).astype(np.int32))
+            scores.append(tail_scores[hits])
+        if not rows:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(scores)
+
+class TicketIndex:
+    """
+    Disk-backed TF-IDF index over the resolved tickets CSV.
+
+    The subject and resolution vectorizers, their TF-IDF matrices (stored as raw CSR arrays plus an
+    impact-ordered inverted index) and the subject/resolution text are written next to the CSV once
+    and memory-mapped on later runs. The index is keyed on the CSV's mtime and SHA-256: if the file
+    is unchanged it is reused as-is, if rows were only appended the new rows are transformed with the
+    existing vocabularies and appended to the index, and anything else triggers a full rebuild. A
+    rebuild is also forced once the appended rows exceed `refit_ratio` of the rows the vectorizers
+    were fitted on, so the IDF weights do not drift too far.
+
+    Several instances (threads, `main.py` next to `batch_worker.py`, ...) can share one index
+    directory: every change is made under an inter-process lock, and each refresh starts from the
+    manifest on disk, so rows another instance already indexed are loaded rather than indexed again.
+    """
+
+    FIELDS = ("subject", "resolution")
+
+    def __init__(self, csv_path, index_dir=None, refit_ratio=0.5, repost_ratio=0.05):
+        """
+        Args:
+            csv_path (str): Path to the CSV file containing resolved tickets.
+            index_dir (str): Directory holding the index files. Defaults to '<csv_path>.index'.
+            refit_ratio (float): Fraction of appended rows (relative to the fitted rows) that triggers a refit.
+            repost_ratio (float): Fraction of rows missing from the inverted index that triggers rebuilding it.
+        """
+        self.csv_path = csv_path
+        self.index_dir = index_dir or f"{csv_path}.index"
+        self.refit_ratio = refit_ratio
+        self.repost_ratio = repost_ratio
+        self.manifest = None
+        # Guards the loaded arrays: searches hold it while reading them, _load while swapping them
+        self._state_lock = threading.RLock()
+        self.fields = {name: _SparseField(name, self.index_dir) for name in self.FIELDS}
+        self.subjects = _TextStore(self._path("subjects"))
+        self.resolutions = _TextStore(self._path("resolutions"))
+
+    @classmethod
+    def open(cls, csv_path, index_dir=None, refit_ratio=0.5):
+        """
+        Open the index for a CSV file, building or updating it as needed.
+
+        Returns:
+            TicketIndex: The ready-to-query index.
+        """
+        index = cls(csv_path, index_dir=index_dir, refit_ratio=refit_ratio)
+        index.refresh()
+        return index
+
+    @property
+    def vectorizer(self):
+        """TfidfVectorizer fitted on the ticket subjects."""
+        return self.fields["subject"].vectorizer
+
+    @property
+    def tfidf_matrix(self):
+        """TF-IDF matrix of the ticket subjects."""
+        return self.fields["subject"].matrix
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _lock(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        return file_lock(self._path("index.lock"))
+
+    def __len__(self):
+        return 0 if self.manifest is None else self.manifest["n_rows"]
+
+    def refresh(self):
+        """
+        Bring the index in line with the CSV on disk.
+
+        Returns:
+            str: 'unchanged', 'appended' or 'rebuilt' depending on how the loaded rows changed,
+            whether this instance did the work or picked up what another instance wrote.
+        """
+        with self._lock():
+            result = self._refresh()
+            self._repost_if_stale()
+            return result
+
+    def _refresh(self):
+        result = "unchanged"
+        # Always start from the manifest on disk: another instance may have appended or rebuilt since
+        manifest = self._read_manifest()
+        if manifest and self.manifest and self._same_rows(manifest, self.manifest):
+            # Only the recorded mtime changed, e.g. another instance found the CSV touched but unchanged
+            self.manifest = manifest
+        elif manifest and manifest != self.manifest:
+            if self.manifest is not None:
+                result = "rebuilt" if manifest["build_sha256"] != self.manifest["build_sha256"] else "appended"
+            self.manifest = manifest
+            self._load()
+
+        stat = os.stat(self.csv_path)
+        if manifest and manifest["csv_size"] == stat.st_size and manifest["csv_mtime_ns"] == stat.st_mtime_ns:
+            return result
+
+        if manifest and stat.st_size == manifest["csv_size"]:
+            # Touched (e.g. copied or re-saved) but possibly unchanged: hashing is far cheaper than a refit
+            if _file_digest(self.csv_path, stat.st_size).hexdigest() == manifest["csv_sha256"]:
+                self._write_manifest(dict(manifest, csv_mtime_ns=stat.st_mtime_ns))
+                return result
+
+        if manifest and stat.st_size > manifest["csv_size"]:
+            hasher = _file_digest(self.csv_path, manifest["csv_size"])
+            if hasher.hexdigest() == manifest["csv_sha256"] and self._ends_with_newline(manifest["csv_size"]):
+                if self._append_csv_tail(hasher, stat):
+                    return "rebuilt" if result == "rebuilt" else "appended"
+
+        self._build()
+        return "rebuilt"
+
+    def build(self):
+        """
+        Fit the vectorizers on the whole CSV and write a fresh index to disk.
+        """
+        with self._lock():
+            self._build()
+
+    def _build(self):
+        if os.path.exists(self._path("manifest.json")):
+            os.remove(self._path("manifest.json"))
+
+        stat = os.stat(self.csv_path)
+        df = load_ticket_data(self.csv_path)
+        df["Subject"] = df["Subject"].fillna("").astype(str)
+        df["Resolution"] = df["Resolution"].fillna("").astype(str)
+
+        fields = {
+            "subject": self.fields["subject"].write(*vectorize_subjects(df)),
+            "resolution": self.fields["resolution"].write(*vectorize_resolutions(df)),
+        }
+
+        self.subjects.write(df["Subject"])
+        self.resolutions.write(df["Resolution"])
+
+        csv_sha256 = _file_digest(self.csv_path, stat.st_size).hexdigest()
+        self._write_manifest({
+            "version": INDEX_VERSION,
+            "csv_size": stat.st_size,
+            "csv_mtime_ns": stat.st_mtime_ns,
+            "csv_sha256": csv_sha256,
+            # Identifies this build; it stays the same while rows are appended, so dependent stores
+            # (e.g. embeddings) know their row numbering is still valid
+            "build_sha256": csv_sha256,
+            "n_rows": len(df),
+            "n_fitted": len(df),
+            "fields": fields,
+        })
+        self._load()
+
+    def add_resolved_tickets(self, subjects, resolutions):
+        """
+        Append newly resolved tickets to the CSV and to the index without refitting.
+
+        Args:
+            subjects (list[str]): Subjects of the resolved tickets.
+            resolutions (list[str]): Resolutions of the resolved tickets, in the same order.
+        """
+        # The CSV is written under the index lock too, so no other instance reads a half-written row
+        with self._lock():
+            self._refresh()
+            columns = pd.read_csv(self.csv_path, nrows=0).columns
+            rows = pd.DataFrame({"Subject": list(subjects), "Resolution": list(resolutions)}).reindex(columns=columns)
+            if not self._ends_with_newline(os.path.getsize(self.csv_path)):
+                with open(self.csv_path, "a", encoding="utf-8") as f:
+                    f.write("\n")
+            rows.to_csv(self.csv_path, mode="a", header=False, index=False)
+            self._refresh()
+            self._repost_if_stale()
+
+    def search(self, query, k=5, field="subject", max_postings=None, subject_weight=0.5):
+        """
+        Find the top-k most similar past tickets.
+
+        Scores are cosine similarities computed from the inverted index. With `max_postings` set, only
+        the highest-weighted postings of each query term are read, which trades recall for latency:
+        the cost no longer grows with the size of the history, and rows that only match on a term's
+        weakest postings can be missed.
+
+        Args:
+            query (str): Text to search for, e.g. the new ticket's subject.
+            k (int): Number of candidates to return.
+            field (str): 'subject', 'resolution', or 'both' to fuse the two similarity scores.
+            max_postings (int): Postings read per query term; None searches exactly.
+            subject_weight (float): Weight of the subject score when `field` is 'both'.
+
+        Returns:
+            list[dict]: Up to k candidates, best first, each with 'index', 'score', 'subject' and 'resolution'.
+        """
+        if field == "both":
+            weights = {"subject": subject_weight, "resolution": 1.0 - subject_weight}
+        elif field in self.fields:
+            weights = {field: 1.0}
+        else:
+            raise ValueError(f"Unknown search field '{field}'; expected 'subject', 'resolution' or 'both'.")
+
+        # Held so a reload by another thread cannot swap the arrays out halfway through the query
+        with self._state_lock:
+            rows, scores = [], []
+            for name, weight in weights.items():
+                field_rows, field_scores = self.fields[name].candidates(query, max_postings)
+                rows.append(field_rows)
+                scores.append(field_scores * weight)
+            rows, scores = np.concatenate(rows), np.concatenate(scores)
+            if rows.size == 0:
+                return []
+
+            unique_rows, inverse = np.unique(rows, return_inverse=True)
+            totals = np.bincount(inverse, weights=scores)
+            k = min(k, totals.size)
+            top = np.argpartition(-totals, k - 1)[:k]
+            top = top[np.argsort(-totals[top])]
+            return [
+                {
+                    "index": int(unique_rows[i]),
+                    "score": float(totals[i]),
+                    "subject": self.subjects[int(unique_rows[i])],
+                    "resolution": self.resolutions[int(unique_rows[i])],
+                }
+                for i in top
+            ]
+
+    def find_similar_ticket(self, new_subject, max_postings=None):
+        """
+        Find the most similar ticket to a new subject based on cosine similarity.
+
+        Args:
+            new_subject (str): The subject of the new ticket to find a similar ticket for.
+            max_postings (int): Postings read per query term; None searches exactly.
+
+        Returns:
+            tuple: A tuple containing:
+                - subject (str): The subject of the most similar ticket.
+                - resolution (str): The resolution of the most similar ticket.
+        """
+        candidates = self.search(new_subject, k=1, max_postings=max_postings)
+        if candidates:
+            return candidates[0]["subject"], candidates[0]["resolution"]
+        # Like the np.argmax over an all-zero similarity vector, fall back to the first ticket
+        with self._state_lock:
+            return self.subjects[0], self.resolutions[0]
+
+    def _repost_if_stale(self):
+        """
+        Rebuild the inverted indexes once too many appended rows are only reachable by exact scoring.
+
+        Only called from refresh, under the index lock and after the manifest was re-read from disk;
+        searches never write to the index.
+        """
+        stale = self._stale_fields()
+        for name in stale:
+            self.fields[name].write_postings(self.fields[name].matrix, self.manifest["fields"][name])
+        if stale:
+            self._write_manifest(self.manifest)
+            self._load()
+
+    def _stale_fields(self):
+        n_rows = self.manifest["n_rows"]
+        return [
+            name for name in self.fields
+            if n_rows - self.manifest["fields"][name]["n_posted"] > max(1000, self.repost_ratio * n_rows)
+        ]
+
+    def _ends_with_newline(self, size):
+        if size == 0:
+            return True
+        with open(self.csv_path, "rb") as f:
+            f.seek(size - 1)
+            return f.read(1) in (b"\n", b"\r")
+
+    def _append_csv_tail(self, hasher, stat):
+        """
+        Index the rows appended to the CSV since the manifest was written.
+
+        Returns:
+            bool: False if too many rows were appended and a refit is due instead.
+        """
+        old_size = self.manifest["csv_size"]
+        with open(self.csv_path, "rb") as f:
+            header = f.readline()
+            f.seek(old_size)
+            tail = f.read(stat.st_size - old_size)
+        hasher.update(tail)
+
+        new_rows = pd.read_csv(io.BytesIO(header + tail))
+        n_rows = self.manifest["n_rows"] + len(new_rows)
+        if n_rows - self.manifest["n_fitted"] > self.refit_ratio * max(self.manifest["n_fitted"], 1):
+            return False
+
+        self._append_rows(new_rows["Subject"].fillna("").astype(str), new_rows["Resolution"].fillna("").astype(str))
+        self.manifest.update({
+            "csv_size": stat.st_size,
+            "csv_mtime_ns": stat.st_mtime_ns,
+            "csv_sha256": hasher.hexdigest(),
+        })
+        self._write_manifest(self.manifest)
+        self._load()
+        return True
+
+    def _append_rows(self, subjects, resolutions):
+        n_rows = self.manifest["n_rows"]
+        self.fields["subject"].append(subjects, n_rows, self.manifest["fields"]["subject"])
+        self.fields["resolution"].append(resolutions, n_rows, self.manifest["fields"]["resolution"])
+        self.subjects.append(subjects)
+        self.resolutions.append(resolutions)
+        self.manifest["n_rows"] += len(subjects)
+
+    @staticmethod
+    def _same_rows(manifest, other):
+        return dict(manifest, csv_mtime_ns=None) == dict(other, csv_mtime_ns=None)
+
+    def _read_manifest(self):
+        try:
+            with open(self._path("manifest.json")) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("version") == INDEX_VERSION else None
+
+    def _write_manifest(self, manifest):
+        tmp_path = self._path("manifest.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._path("manifest.json"))
+        self.manifest = manifest
+
+    def _load(self):
+        with self._state_lock:
+            n_rows = self.manifest["n_rows"]
+            for name, field in self.fields.items():
+                field.load(n_rows, self.manifest["fields"][name], self.manifest["build_sha256"])
+            self.subjects.load(n_rows)
+            self.resolutions.load(n_rows)
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; traces are then recorded without the peak
+    resource = None
+
+# Resident set size of this process right now, in pages; only Linux exposes it without extra packages
+STATM_PATH = "/proc/self/statm"
+
+# Serializes writes from the interactive loop, prefetch workers and batch executors
+_write_lock = threading.Lock()
+
+def peak_rss_mb():
+    """
+    Return the process's resident memory high-water mark so far.
+
+    Returns:
+        float: Peak resident set size in MB, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def current_rss_mb():
+    """
+    Return the process's resident memory right now.
+
+    Unlike the high-water mark, this goes down again when memory is freed, so samples taken before
+    and after a stage show what that stage held on to.
+
+    Returns:
+        float: Resident set size in MB, or None where the platform does not report it.
+    """
+    try:
+        with open(STATM_PATH) as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+class TicketTrace:
+    """
+    Per-stage timing spans for one ticket, written as a single JSON line when the ticket is done.
+
+    Each span records its start offset and duration, whether it raised, and the resident memory of
+    the process when it finished along with the change since it started (Linux only). Memory is
+    process-wide, so with several tickets in flight (prefetch, batch mode) a span's change includes
+    whatever the other threads allocated or freed meanwhile. The trace as a whole records the
+    process's peak resident memory.
+    """
+
+    def __init__(self, ticket_number, path=None, **fields):
+        """
+        Args:
+            ticket_number (str): Ticket the spans belong to.
+            path (str): JSON lines file the trace is appended to. Defaults to TRACE_FILE from the
+                environment ('ticket_traces.jsonl'); an empty value disables writing.
+            **fields: Extra fields stored on the trace record, e.g. mode='interactive'.
+        """
+        self.ticket_number = ticket_number
+        self.path = os.getenv("TRACE_FILE", "ticket_traces.jsonl") if path is None else path
+        self.fields = fields
+        self.spans = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """
+        Context manager that times a stage.
+
+        Args:
+            name (str): Stage name, e.g. 'scrape', 'clean', 'summarize', 'retrieve', 'llm' or 'type'.
+            **attrs: Extra fields stored on the span.
+
+        Yields:
+            dict: The span record, so the stage can add fields such as sizes or token counts.
+        """
+        record = dict(attrs, name=name, thread=threading.current_thread().name)
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        record["start_s"] = round(start - self._start, 6)
+        record["ok"] = False
+        try:
+            yield record
+            record["ok"] = True
+        finally:
+            record["duration_s"] = round(time.perf_counter() - start, 6)
+            rss_after = current_rss_mb()
+            if rss_after is not None and rss_before is not None:
+                record["rss_mb"] = round(rss_after, 1)
+                record["rss_delta_mb"] = round(rss_after - rss_before, 1)
+            with self._lock:
+                self.spans.append(record)
+
+    def durations(self):
+        """
+        Returns:
+            dict: Total seconds spent in each span name.
+        """
+        totals = {}
+        with self._lock:
+            for record in self.spans:
+                totals[record["name"]] = totals.get(record["name"], 0.0) + record["duration_s"]
+        return totals
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda record: record["start_s"])
+        return dict(
+            self.fields,
+            ticket=self.ticket_number,
+            started_at=self.started_at,
+            total_s=round(time.perf_counter() - self._start, 6),
+            peak_rss_mb=peak_rss_mb(),
+            spans=spans,
+        )
+
+    def finish(self):
+        """
+        Append the trace to the JSON lines file.
+
+        Returns:
+            dict: The trace record that was written.
+        """
+        record = self.to_dict()
+        if self.path:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with _write_lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        return record
@@ -0,0 +1,109 @@
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from colors import RESET, YELLOW
+
+# (description, seconds waited, satisfied) for every wait, newest last
+wait_timings = []
+
+def wait_for(driver, condition, description, timeout=15, required=True, poll_frequency=0.1):
+    """
+    Wait until a readiness condition holds and report how long it actually took.
+
+    Args:
+        driver: Selenium WebDriver instance.
+        condition (callable): WebDriverWait condition, called with the driver until it returns a truthy value.
+        description (str): Human-readable name of what is being waited for.
+        timeout (float): Maximum number of seconds to wait.
+        required (bool): Raise TimeoutException on timeout instead of returning None.
+        poll_frequency (float): Seconds between checks of the condition.
+
+    Returns:
+        The truthy value returned by the condition, or None if an optional wait timed out.
+    """
+    start = time.perf_counter()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condition)
+    except TimeoutException:
+        elapsed = time.perf_counter() - start
+        wait_timings.append((description, elapsed, False))
+        print(f"{YELLOW}Timed out after {elapsed:.2f}s waiting for {description}.{RESET}")
+        if required:
+            raise
+        return None
+    elapsed = time.perf_counter() - start
+    wait_timings.append((description, elapsed, True))
+    print(f"{YELLOW}Waited {elapsed:.2f}s for {description}.{RESET}")
+    return result
+
+def document_ready():
+    """
+    Condition: the current document has finished loading.
+    """
+    return lambda driver: driver.execute_script("return document.readyState") == "complete"
+
+def element_present(locator):
+    """
+    Condition: an element matching the locator is attached to the DOM. Returns the element.
+    """
+    return EC.presence_of_element_located(locator)
+
+def element_clickable(locator):
+    """
+    Condition: an element matching the locator is visible and enabled. Returns the element.
+    """
+    return EC.element_to_be_clickable(locator)
+
+def element_shown(element):
+    """
+    Condition: the element's inline style no longer contains 'display: none'.
+    """
+    return lambda driver: "display: none" not in (element.get_attribute("style") or "")
+
+def element_stale(element):
+    """
+    Condition: the element has been detached from the DOM, e.g. after navigating away.
+    """
+    return EC.staleness_of(element)
+
+# Counts rendered elements in the page; an element has client rects only while it is displayed
+COUNT_DISPLAYED_SCRIPT = """
+return Array.from(document.querySelectorAll(arguments[0])).filter(element => element.getClientRects().length > 0).length;
+"""
+
+def count_displayed(driver, css_selector):
+    """
+    Count the displayed elements matching a CSS selector in a single WebDriver round trip.
+
+    Args:
+        driver: Selenium WebDriver instance.
+        css_selector (str): Selector of the elements to count.
+
+    Returns:
+        int: Number of matching elements that are displayed.
+    """
+    return driver.execute_script(COUNT_DISPLAYED_SCRIPT, css_selector)
+
+def element_count_above(css_selector, count):
+    """
+    Condition: more than `count` displayed elements match the CSS selector. Each poll is one script call.
+    """
+    return lambda driver: count_displayed(driver, css_selector) > count
+
+def iframe_ready(locator):
+    """
+    Condition: the iframe matching the locator is present and its document has finished loading with a body.
+    Returns the iframe element.
+    """
+    def _condition(driver):
+        for iframe in driver.find_elements(*locator):
+            loaded = driver.execute_script(
+                "const doc = arguments[0].contentDocument;"
+                "return !!doc && doc.readyState === 'complete' && !!doc.body;",
+                iframe,
+            )
+            if loaded:
+                return iframe
+        return False
+    return _condition